@@ -0,0 +1,255 @@
+import argparse
+import csv
+import json
+import os
+import subprocess
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from wrap_params import WrapParams
+
+
+# 商品（SKU）ごとの箱・包装紙の寸法のリストから、まとめて包装シーンやキャッシュを作る
+#
+#   python batch_wrap.py skus.csv --out out/ --mode numpy
+#   python batch_wrap.py skus.json --out out/ --mode blender --blender /path/to/blender
+#
+# CSV の列：name, box_width, box_depth, box_height, paper_size, paper_offset_x, paper_offset_y
+#           （number_cuts, tessellation は省略可）
+# JSON：上と同じキーのオブジェクトのリスト（box_dims: [幅, 奥行き, 高さ] でもよい）
+#
+# --check を付けると、ジョブごとに包装紙と箱のめり込みも調べる（penetration_check.py）
+# blender モードで表示用の軽い包装紙（LOD）も作る場合は --lod Viewport=20 のように指定する（既定は作らない）
+#
+# ジョブはプロセスプールで並列に処理する。各ワーカープロセスは最初のジョブで準備をして、
+# 以降のジョブでも使い回す（blender モードでは Blender をワーカーごとに1回だけ起動する）
+
+JOB_FIELDS = ("box_dims", "paper_size", "paper_offset_x", "paper_offset_y", "number_cuts", "tessellation")
+FLOAT_FIELDS = ("paper_size", "paper_offset_x", "paper_offset_y")
+# blender_worker.py が結果の JSON を出力する行の先頭
+RESULT_PREFIX = "WRAP_RESULT "
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def normalize_job(row, index):
+    # CSV の行や JSON のオブジェクトを {"name": ..., WrapParams のフィールド...} にそろえる
+    job = {"name": str(row.get("name") or f"job_{index:04d}")}
+    if "box_dims" in row:
+        job["box_dims"] = [float(value) for value in row["box_dims"]]
+    else:
+        job["box_dims"] = [float(row["box_width"]), float(row["box_depth"]), float(row["box_height"])]
+    for field in FLOAT_FIELDS:
+        if row.get(field) not in (None, ""):
+            job[field] = float(row[field])
+    if row.get("number_cuts") not in (None, ""):
+        job["number_cuts"] = int(row["number_cuts"])
+    if row.get("tessellation"):
+        job["tessellation"] = row["tessellation"]
+    return job
+
+
+def load_jobs(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+    return [normalize_job(row, index) for index, row in enumerate(rows)]
+
+
+def job_params(job):
+    fields = {key: job[key] for key in JOB_FIELDS if key in job}
+    fields["box_dims"] = tuple(fields["box_dims"])
+    return WrapParams(**fields)
+
+
+# --- NumPy ワーカー（Blenderなし、焼き込みキャッシュだけを出力する） ---
+
+def run_numpy_job(job):
+    from paper_mesh import paper_mesh_arrays
+    from vertex_cache import bake_rig
+    from wrap_rig import fold_bones
+    from wrap_weights import compute_fold_weights, paper_matrix_world, to_world
+
+    stages = {}
+    params = job_params(job)
+
+    start = time.perf_counter()
+    vertices, faces = paper_mesh_arrays(params)
+    matrix_world = paper_matrix_world(params)
+    rest_co = to_world(vertices, matrix_world)
+    stages["mesh"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    weights = compute_fold_weights(rest_co, params)
+    stages["weights"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    output = os.path.join(job["out_dir"], job["name"] + ".vcache")
+    bake_rig(output, rest_co, weights, fold_bones(params), matrix_world, job["frame_start"], job["frame_end"])
+    stages["bake"] = time.perf_counter() - start
+    return {"name": job["name"], "ok": True, "output": output, "stages": stages}
+
+
+# --- Blender ワーカー（ワーカープロセスごとに Blender を1つ起動して使い回す） ---
+
+_blender = None
+
+
+def _start_blender(blender_path):
+    global _blender
+    if _blender is None or _blender.poll() is not None:
+        _blender = subprocess.Popen(
+            [
+                blender_path, "--background", "--factory-startup",
+                "--python", os.path.join(script_dir, "blender_worker.py"),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+    return _blender
+
+
+def run_blender_job(job):
+    blender = _start_blender(job["blender_path"])
+    job = dict(
+        job,
+        blend_path=os.path.join(job["out_dir"], job["name"] + ".blend"),
+        report_path=os.path.join(job["out_dir"], job["name"] + ".stages.json"),
+    )
+    blender.stdin.write(json.dumps(job) + "\n")
+    blender.stdin.flush()
+    for line in blender.stdout:
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    return {"name": job["name"], "ok": False, "error": "Blender が終了しました"}
+
+
+def check_job(job, result):
+    # 包装紙と箱のめり込み（numpy モードは焼き込んだキャッシュ、blender モードは NumPy の変形計算で調べる）
+    from penetration_check import check_cache, check_rig
+
+    params = job_params(job)
+    if result["output"].endswith(".vcache"):
+        report = check_cache(result["output"], params)
+    else:
+        report = check_rig(params, list(range(job["frame_start"], job["frame_end"] + 1)))
+    return {key: report[key] for key in ("max_depth", "worst_frame", "total_depth", "penetrating_frames")}
+
+
+def run_job(job):
+    start = time.perf_counter()
+    try:
+        if job["mode"] == "blender":
+            result = run_blender_job(job)
+        else:
+            result = run_numpy_job(job)
+        if result["ok"] and job.get("check"):
+            check_start = time.perf_counter()
+            result["penetration"] = check_job(job, result)
+            result["stages"]["check"] = time.perf_counter() - check_start
+    except Exception as error:
+        result = {"name": job["name"], "ok": False, "error": repr(error)}
+    result["wall"] = time.perf_counter() - start
+    result["pid"] = os.getpid()
+    return result
+
+
+def run_batch(
+    jobs, out_dir, mode="numpy", workers=None, blender_path="blender", frame_start=1, frame_end=190, check=False,
+    paper_lods=None,
+):
+    # blender モードでは SKU ごとにパラメータが違うのでウェイトキャッシュは使わない
+    # （ヒットせず、ワーカー間で LRU の入れ替えが起きるだけ）
+    # LOD は scripting.py の表示用の既定値に依らないように、paper_lods（既定は作らない）を明示して渡す
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [
+        dict(
+            job,
+            mode=mode,
+            out_dir=os.path.abspath(out_dir),
+            blender_path=blender_path,
+            frame_start=frame_start,
+            frame_end=frame_end,
+            check=check,
+            weight_cache=False,
+            paper_lods=dict(paper_lods or {}),
+        )
+        for job in jobs
+    ]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        results = list(pool.map(run_job, jobs))
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    # スループット（jobs/min）とステージごとの平均時間
+    succeeded = [result for result in results if result["ok"]]
+    stage_totals = defaultdict(float)
+    for result in succeeded:
+        for stage, seconds in result["stages"].items():
+            stage_totals[stage] += seconds
+    lines = [
+        f"ジョブ: {len(succeeded)}/{len(results)} 成功, ワーカー {len({r['pid'] for r in results})} 個, "
+        f"{elapsed:.1f} 秒, {len(succeeded) / elapsed * 60 if elapsed else 0:.1f} jobs/min",
+    ]
+    for stage, total in stage_totals.items():
+        lines.append(f"  {stage}: 平均 {total / len(succeeded) * 1000:.1f} ms")
+    for result in results:
+        if not result["ok"]:
+            lines.append(f"  失敗 {result['name']}: {result['error']}")
+        elif result.get("penetration", {}).get("max_depth", 0.0) > 0.0:
+            penetration = result["penetration"]
+            lines.append(
+                f"  めり込み {result['name']}: 最大 {penetration['max_depth']:.4f}"
+                f"（フレーム {penetration['worst_frame']}）, {len(penetration['penetrating_frames'])} フレーム"
+            )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="複数の箱の寸法で包装シーン・キャッシュをまとめて作る")
+    parser.add_argument("jobs", help="ジョブのリスト（.csv または .json）")
+    parser.add_argument("--out", default="batch_output", help="出力フォルダ")
+    parser.add_argument("--mode", choices=("numpy", "blender"), default="numpy")
+    parser.add_argument("--workers", type=int, default=None, help="ワーカー数（既定は CPU コア数）")
+    parser.add_argument("--blender", default="blender", help="Blender の実行ファイル")
+    parser.add_argument("--frame-start", type=int, default=1)
+    parser.add_argument("--frame-end", type=int, default=190)
+    parser.add_argument("--check", action="store_true", help="包装紙と箱のめり込みも調べる")
+    parser.add_argument(
+        "--lod", action="append", default=[], metavar="NAME=CUTS",
+        help="blender モードで作る表示用の包装紙（例：Viewport=20、複数指定可）",
+    )
+    args = parser.parse_args(argv)
+
+    paper_lods = {}
+    for lod in args.lod:
+        name, _, cuts = lod.partition("=")
+        if not name or not cuts.isdigit():
+            parser.error(f"--lod は NAME=CUTS の形で指定してください: {lod!r}")
+        paper_lods[name] = int(cuts)
+
+    results, elapsed = run_batch(
+        load_jobs(args.jobs),
+        args.out,
+        mode=args.mode,
+        workers=args.workers,
+        blender_path=args.blender,
+        frame_start=args.frame_start,
+        frame_end=args.frame_end,
+        check=args.check,
+        paper_lods=paper_lods,
+    )
+    print(summarize(results, elapsed))
+    with open(os.path.join(args.out, "batch_report.json"), "w", encoding="utf-8") as f:
+        json.dump({"elapsed": elapsed, "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
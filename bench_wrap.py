@@ -0,0 +1,197 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import runpy
+import sys
+
+import numpy as np
+
+from stage_timer import StageTimer
+
+
+# 包装パイプラインのベンチマーク（解像度ごとの各ステージの時間とメモリのピーク）
+#
+#   python bench_wrap.py                                 # NumPy の参照実装（Blender不要）
+#   blender -b --factory-startup --python bench_wrap.py -- --backend bpy
+#   python bench_wrap.py --compare bench_results/old.json bench_results/new.json
+#
+# ステージ：mesh（メッシュ作成）、weights（ウェイト計算）、vertex_groups（頂点グループの書き込み）、
+#           keyframes（キーフレーム作成）、deform（全フレームの変形の評価）
+# 結果は JSON で保存し、--compare で2回分の結果を比べられる
+
+CUTS = (10, 30, 60, 120, 250)
+FRAME_START = 1
+FRAME_END = 190
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def bench_numpy(number_cuts, track_memory=False, chunk_size=16):
+    # Blenderなしの参照実装で各ステージを実行する
+    from paper_mesh import flatten_faces, grid_uvs, paper_mesh_arrays
+    from wrap_params import WrapParams
+    from wrap_rig import fold_bones
+    from wrap_skinning import evaluate_frames
+    from wrap_timeline import KEYFRAMES, drop_hold_keys, keyframe_channels
+    from wrap_weights import compute_fold_weights, group_by_weight, paper_matrix_world, to_sparse, to_world
+
+    params = WrapParams(number_cuts=number_cuts)
+    timer = StageTimer(track_memory=track_memory)
+
+    timer.begin("mesh")
+    vertices, faces = paper_mesh_arrays(params)
+    loops, sizes = flatten_faces(faces)
+    grid_uvs(vertices, loops)
+    timer.count(vertices=len(vertices), faces=len(sizes))
+
+    timer.begin("weights")
+    rest_co = to_world(vertices, paper_matrix_world(params))
+    weights = compute_fold_weights(rest_co, params)
+
+    # VertexGroup.add() に渡す（ウェイト, 頂点インデックス）のまとまりを作るところまで
+    timer.begin("vertex_groups")
+    calls = sum(len(group_by_weight(bone_weights)) for bone_weights in weights.T)
+    sparse = to_sparse(weights)
+    timer.count(vertex_group_add_calls=calls)
+
+    # Fカーブの keyframe_points に書き込む配列を作るところまで
+    timer.begin("keyframes")
+    keyframe_arrays = [
+        np.array(drop_hold_keys(keys), dtype=np.float32).ravel()
+        for keys in keyframe_channels(KEYFRAMES).values()
+    ]
+    timer.count(keyframes=sum(len(array) // 2 for array in keyframe_arrays))
+
+    # 全フレームの変形（結果は保持せず chunk_size フレームずつ捨てる）
+    timer.begin("deform")
+    bones = fold_bones(params)
+    for start in range(FRAME_START, FRAME_END + 1, chunk_size):
+        frames = np.arange(start, min(start + chunk_size, FRAME_END + 1))
+        evaluate_frames(rest_co, sparse, bones, frames, chunk_size=chunk_size)
+    timer.count(frames=FRAME_END - FRAME_START + 1)
+    timer.end()
+    return timer.records
+
+
+def bench_bpy(number_cuts, track_memory=False):
+    # Blender の中で scripting.py を実行し、そのステージの記録と全フレームの変形時間を使う
+    import bpy
+
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    # numpy のベンチマークと同じ処理だけを測るため、LOD・焼き込み・頂点グループの比較は作らない
+    job = {
+        "number_cuts": number_cuts,
+        "weight_cache": False,
+        "paper_lods": {},
+        "report_vertex_group_stats": False,
+        "bake_vertex_cache": False,
+        "track_memory": track_memory,
+        "report_path": os.path.join(script_dir, "reports", f"bench_bpy_{number_cuts}.json"),
+    }
+    namespace = runpy.run_path(
+        os.path.join(script_dir, "scripting.py"), init_globals={"WRAP_JOB": job}, run_name="__main__"
+    )
+    names = {"paper_mesh": "mesh"}
+    records = [
+        dict(record, stage=names.get(record["stage"], record["stage"]))
+        for record in namespace["stage_timer"].records
+        if record["stage"] in ("paper_mesh", "weights", "vertex_groups", "keyframes")
+    ]
+
+    scene = bpy.context.scene
+    paper = namespace["paper"]
+    timer = StageTimer(track_memory=track_memory)
+    timer.begin("deform")
+    for frame in range(FRAME_START, FRAME_END + 1):
+        scene.frame_set(frame)
+        paper_eval = paper.evaluated_get(bpy.context.evaluated_depsgraph_get())
+        paper_eval.to_mesh()
+        paper_eval.to_mesh_clear()
+    timer.count(frames=FRAME_END - FRAME_START + 1)
+    timer.end()
+    return records + timer.records
+
+
+def run_suite(backend, cuts=CUTS, repeat=1):
+    bench = bench_bpy if backend == "bpy" else bench_numpy
+    results = []
+    for number_cuts in cuts:
+        # 同じ解像度を repeat 回実行し、ステージごとに最も速かった回を使う
+        best = {}
+        for _ in range(repeat):
+            for record in bench(number_cuts):
+                if record["stage"] not in best or record["seconds"] < best[record["stage"]]["seconds"]:
+                    best[record["stage"]] = record
+        # tracemalloc は処理を遅くするので、メモリのピークは別の回で計る
+        for record in bench(number_cuts, track_memory=True):
+            best[record["stage"]]["peak_bytes"] = record["peak_bytes"]
+        results.append({"number_cuts": number_cuts, "stages": list(best.values())})
+        print(format_result(results[-1]))
+    return {
+        "backend": backend,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def format_result(result):
+    lines = [f"number_cuts={result['number_cuts']}"]
+    for record in result["stages"]:
+        peak = record.get("peak_bytes", 0) / 2 ** 20
+        lines.append(f"  {record['stage']:<14} {record['seconds'] * 1000:10.1f} ms {peak:9.1f} MiB")
+    return "\n".join(lines)
+
+
+def compare(old_path, new_path):
+    # 2回分の結果をステージごとに比べる（比が1より小さければ速くなった）
+    with open(old_path, encoding="utf-8") as f:
+        old = {r["number_cuts"]: {s["stage"]: s for s in r["stages"]} for r in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = {r["number_cuts"]: {s["stage"]: s for s in r["stages"]} for r in json.load(f)["results"]}
+    lines = []
+    for number_cuts in sorted(set(old) & set(new)):
+        lines.append(f"number_cuts={number_cuts}")
+        for stage, record in new[number_cuts].items():
+            if stage in old[number_cuts]:
+                before = old[number_cuts][stage]["seconds"]
+                lines.append(
+                    f"  {stage:<14} {before * 1000:10.1f} ms → {record['seconds'] * 1000:10.1f} ms"
+                    f" (x{record['seconds'] / before if before else float('inf'):.2f})"
+                )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    # Blender から実行した場合は "--" より後ろだけを引数として使う
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description="包装パイプラインのベンチマーク")
+    parser.add_argument("--backend", choices=("numpy", "bpy"), default="numpy")
+    parser.add_argument("--cuts", type=int, nargs="+", default=list(CUTS))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default=None, help="結果の JSON（既定は bench_results/ の下）")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="2つの結果の JSON を比べる")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        print(compare(*args.compare))
+        return
+
+    report = run_suite(args.backend, args.cuts, args.repeat)
+    output = args.output or os.path.join(
+        script_dir, "bench_results", f"{args.backend}_{datetime.datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"結果: {output}")
+
+
+if __name__ == "__main__":
+    main()
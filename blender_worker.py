@@ -0,0 +1,54 @@
+import json
+import os
+import runpy
+import sys
+import time
+import traceback
+
+import bpy
+
+
+# batch_wrap.py から起動されるバックグラウンドの Blender ワーカー
+#   blender --background --factory-startup --python blender_worker.py
+# 標準入力から1行1ジョブ（JSON）を受け取り、scripting.py でシーンを作って .blend に保存する
+# Blender の起動は1回だけで、同じプロセスで次々にジョブを処理する
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+scripting_path = os.path.join(script_dir, "scripting.py")
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+
+from batch_wrap import RESULT_PREFIX
+
+
+def run_job(job):
+    stages = {}
+
+    start = time.perf_counter()
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    stages["reset"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    namespace = runpy.run_path(scripting_path, init_globals={"WRAP_JOB": job}, run_name="__main__")
+    stages["build"] = time.perf_counter() - start
+    # scripting.py のステップごとの時間も結果に含める
+    for stage, seconds in namespace["stage_timer"].stage_seconds().items():
+        stages["build." + stage] = seconds
+
+    start = time.perf_counter()
+    output = job["blend_path"]
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    bpy.ops.wm.save_as_mainfile(filepath=output)
+    stages["save"] = time.perf_counter() - start
+    return {"name": job["name"], "ok": True, "output": output, "stages": stages}
+
+
+for line in sys.stdin:
+    if not line.strip():
+        continue
+    job = json.loads(line)
+    try:
+        result = run_job(job)
+    except Exception:
+        result = {"name": job.get("name"), "ok": False, "error": traceback.format_exc()}
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
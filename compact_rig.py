@@ -0,0 +1,319 @@
+import argparse
+import dataclasses
+import json
+import os
+import struct
+import tempfile
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from wrap_rig import FoldBone
+from wrap_skinning import pose_matrices, rest_matrices, skin
+from wrap_timeline import KEYFRAMES, evaluate_keyframes
+from wrap_weights import to_sparse
+
+
+# SKU ごとのリグ（包装紙のメッシュ・ウェイト・ボーン）を小さく保存し、メモリマップでそのまま読み込む形式
+# ファイルの中身：64バイトのヘッダー＋以下の配列（それぞれ16バイト境界から）＋メタデータ（JSON）
+#   レスト位置      float32 (N, 3)     ワールド座標（matrix_world を掛けた後）
+#   逆バインド行列  float32 (B, 4, 4)  ボーンのレスト行列の逆行列
+#   影響ボーン      uint8 (N, K)       ボーンの番号（NO_BONE は影響なし）、ウェイトの大きい順
+#   影響ウェイト    uint8 / float16 (N, K)  頂点ごとに合計1に正規化したウェイト
+#   面              uint32 のループの頂点インデックス、uint8 の面ごとの頂点数
+# ウェイトは頂点ごとに大きい方から TOP_K 本だけ残す
+# （アーマチュアモディファイアはウェイトの合計で正規化するので、正規化しても変形は変わらない）
+
+MAGIC = b"WRAPRIG1"
+VERSION = 1
+# マジック、バージョン、頂点数、ボーン数、K、ウェイトの形式、ループ数、面の数、メタデータのバイト数
+HEADER = struct.Struct("<8sIIIIIIII")
+HEADER_SIZE = 64
+ALIGNMENT = 16
+
+TOP_K = 3
+NO_BONE = 255
+WEIGHT_FORMATS = ("uint8", "float16")
+# 合計がこれ以下の頂点は動かない（wrap_skinning.skin と同じ）
+MIN_TOTAL_WEIGHT = 0.0001
+
+CompactRig = namedtuple(
+    "CompactRig",
+    (
+        "params", "bones", "weight_format", "rest_co", "inverse_bind",
+        "influence_bones", "influence_weights", "loops", "sizes",
+    ),
+)
+
+
+def top_k_influences(weights, k=TOP_K):
+    # (N, B) のウェイトから、頂点ごとに大きい方から k 本のボーンと、合計1に正規化したウェイト
+    # 戻り値は（ボーン番号 (N, k) uint8, ウェイト (N, k) float32, k 本より多くのボーンを持つ頂点の数）
+    weights = np.asarray(weights, dtype=np.float32)
+    if weights.shape[1] >= NO_BONE:
+        raise ValueError(f"ボーンが多すぎます（{NO_BONE - 1} 本まで）: {weights.shape[1]}")
+    order = np.argsort(-weights, axis=1, kind="stable")[:, :k]
+    top = np.take_along_axis(weights, order, axis=1)
+    total = top.sum(axis=1)
+    moving = total > MIN_TOTAL_WEIGHT
+    top = np.where(moving[:, None] & (top > 0.0), top / np.where(moving, total, 1.0)[:, None], 0.0)
+    bones = np.where(top > 0.0, order, NO_BONE).astype(np.uint8)
+    truncated = int(np.count_nonzero(np.count_nonzero(weights > 0.0, axis=1) > k))
+    return bones, top.astype(np.float32), truncated
+
+
+def quantize_weights(weights, weight_format):
+    # 正規化したウェイト (N, K) を保存する形式にする
+    # uint8 は 1/255 単位で、頂点ごとの合計がちょうど255になるように最大のウェイトで丸め誤差を吸収する
+    if weight_format == "float16":
+        return weights.astype(np.float16)
+    if weight_format != "uint8":
+        raise ValueError(f"ウェイトの形式は {WEIGHT_FORMATS} のどれかです: {weight_format!r}")
+    quantized = np.rint(weights * 255.0).astype(np.int32)
+    moving = weights.sum(axis=1) > 0.0
+    error = np.where(moving, 255 - quantized.sum(axis=1), 0)
+    quantized[np.arange(len(weights)), 0] += error
+    return quantized.astype(np.uint8)
+
+
+def dequantize_weights(stored, weight_format):
+    if weight_format == "uint8":
+        return stored.astype(np.float32) / 255.0
+    return stored.astype(np.float32)
+
+
+def _sections(vertex_count, bone_count, k, weight_format, loop_count, face_count):
+    # 配列ごとの（名前, 型, 形）と、ファイルの先頭からのオフセット
+    layout = (
+        ("rest_co", np.float32, (vertex_count, 3)),
+        ("inverse_bind", np.float32, (bone_count, 4, 4)),
+        ("influence_bones", np.uint8, (vertex_count, k)),
+        ("influence_weights", np.dtype(weight_format), (vertex_count, k)),
+        ("loops", np.uint32, (loop_count,)),
+        ("sizes", np.uint8, (face_count,)),
+    )
+    sections = []
+    offset = HEADER_SIZE
+    for name, dtype, shape in layout:
+        sections.append((name, np.dtype(dtype), shape, offset))
+        offset += -(-np.dtype(dtype).itemsize * int(np.prod(shape)) // ALIGNMENT) * ALIGNMENT
+    return sections, offset
+
+
+def write_rig(path, params, rest_co, faces, weights, bones, weight_format="uint8", k=TOP_K):
+    # rest_co（ワールド座標）、faces（paper_mesh_arrays の面）、weights（(N, B) の float32）、bones を保存する
+    from paper_mesh import flatten_faces
+
+    influence_bones, influence_weights, _ = top_k_influences(weights, k)
+    loops, sizes = flatten_faces(faces)
+    metadata = json.dumps({
+        "params": dataclasses.asdict(params),
+        "bones": [bone._asdict() for bone in bones],
+    }).encode("utf-8")
+    arrays = {
+        "rest_co": rest_co,
+        "inverse_bind": np.linalg.inv(rest_matrices(bones)),
+        "influence_bones": influence_bones,
+        "influence_weights": quantize_weights(influence_weights, weight_format),
+        "loops": loops,
+        "sizes": sizes,
+    }
+    sections, metadata_offset = _sections(
+        len(rest_co), len(bones), k, weight_format, len(loops), len(sizes)
+    )
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # 途中で止まっても壊れたファイルが残らないように、一時ファイルに書いてから置き換える
+    # （複数のワーカーが同じリグを書くことがあるので、一時ファイルの名前はプロセスごとに変える）
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=directory or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(
+                MAGIC, VERSION, len(rest_co), len(bones), k, WEIGHT_FORMATS.index(weight_format),
+                len(loops), len(sizes), len(metadata),
+            ).ljust(HEADER_SIZE, b"\0"))
+            for name, dtype, shape, offset in sections:
+                f.seek(offset)
+                f.write(np.ascontiguousarray(arrays[name], dtype=dtype).reshape(shape).tobytes())
+            f.seek(metadata_offset)
+            f.write(metadata)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def build_rig(path, params, weight_format="uint8", weights=None, k=TOP_K):
+    # params の包装紙のリグを計算して保存する（weights を渡した場合はウェイトの計算を省く）
+    from paper_mesh import paper_mesh_arrays
+    from wrap_rig import fold_bones
+    from wrap_weights import compute_fold_weights, paper_matrix_world, to_world
+
+    vertices, faces = paper_mesh_arrays(params)
+    rest_co = to_world(vertices, paper_matrix_world(params))
+    if weights is None:
+        weights = compute_fold_weights(rest_co, params)
+    return write_rig(path, params, rest_co, faces, weights, fold_bones(params), weight_format, k)
+
+
+def open_rig(path):
+    # 読み込み専用でメモリマップする（配列はファイルのビューで、コピーしない）
+    from wrap_params import WrapParams
+
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    (
+        magic, version, vertex_count, bone_count, k, weight_format,
+        loop_count, face_count, metadata_size,
+    ) = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"リグの形式が違います: {path}")
+    weight_format = WEIGHT_FORMATS[weight_format]
+    sections, metadata_offset = _sections(vertex_count, bone_count, k, weight_format, loop_count, face_count)
+    arrays = {
+        name: data[offset:offset + dtype.itemsize * int(np.prod(shape))].view(dtype).reshape(shape)
+        for name, dtype, shape, offset in sections
+    }
+    metadata = json.loads(bytes(data[metadata_offset:metadata_offset + metadata_size]))
+    params = metadata["params"]
+    params["box_dims"] = tuple(params["box_dims"])
+    bones = tuple(
+        FoldBone(bone["name"], tuple(bone["head"]), tuple(bone["tail"]), bone["parent"])
+        for bone in metadata["bones"]
+    )
+    return CompactRig(WrapParams(**params), bones, weight_format, **arrays)
+
+
+def rig_weights(rig):
+    # (N, B) の float32 のウェイト（頂点ごとに合計1、assign_vertex_groups / evaluate_frames に渡せる）
+    weights = np.zeros((len(rig.rest_co), len(rig.bones) + 1), dtype=np.float32)
+    bones = np.where(rig.influence_bones == NO_BONE, len(rig.bones), rig.influence_bones)
+    np.put_along_axis(weights, bones, dequantize_weights(rig.influence_weights, rig.weight_format), axis=1)
+    return weights[:, :-1]
+
+
+def rig_faces(rig):
+    # paper_mesh_arrays と同じ形の面（すべて同じ頂点数なら (F, k) の配列、違えば面のリスト）
+    if len(rig.sizes) and np.all(rig.sizes == rig.sizes[0]):
+        return rig.loops.reshape(-1, int(rig.sizes[0]))
+    loops = rig.loops.tolist()
+    ends = np.cumsum(rig.sizes, dtype=np.int64).tolist()
+    return [loops[end - size:end] for end, size in zip(ends, rig.sizes.tolist())]
+
+
+def evaluate_rig(rig, frames, keyframes=KEYFRAMES, weights=None):
+    # 保存した逆バインド行列を使って、frames の包装紙の頂点座標 (F, N, 3)（float32、ワールド座標）を計算する
+    frames = np.atleast_1d(frames)
+    names = [bone.name for bone in rig.bones]
+    eulers = evaluate_keyframes(frames, names, keyframes)
+    matrices = pose_matrices(rig.bones, rest_matrices(rig.bones), eulers) @ rig.inverse_bind
+    sparse = to_sparse(rig_weights(rig) if weights is None else weights)
+    return skin(rig.rest_co, sparse, matrices).astype(np.float32)
+
+
+def compare_rig(path, frames, chunk_size=32):
+    # 保存したリグの大きさと、float32 のウェイトで計算した場合との差
+    from paper_mesh import paper_mesh_arrays
+    from wrap_rig import fold_bones
+    from wrap_skinning import evaluate_frames
+    from wrap_weights import compute_fold_weights, paper_matrix_world, to_world
+
+    start = time.perf_counter()
+    rig = open_rig(path)
+    weights = rig_weights(rig)
+    rig_faces(rig)
+    load_time = time.perf_counter() - start
+
+    params = rig.params
+    vertices, _ = paper_mesh_arrays(params)
+    rest_co = to_world(vertices, paper_matrix_world(params))
+    exact = compute_fold_weights(rest_co, params).astype(np.float32)
+    total = exact.sum(axis=1, keepdims=True)
+    normalized = np.where(total > MIN_TOTAL_WEIGHT, exact / np.where(total > 0.0, total, 1.0), 0.0)
+    # K 本より多くのボーンを持つ頂点（切り捨てたボーンの分だけ変形が変わる）
+    truncated = np.count_nonzero(exact > 0.0, axis=1) > rig.influence_bones.shape[1]
+
+    # ウェイトの大きさ：密な float32 (N, B)、ボーンごとの（uint32 のインデックス, float32 のウェイト）、この形式
+    vertex_count, bone_count = exact.shape
+    dense_bytes = vertex_count * bone_count * 4
+    sparse_bytes = int(np.count_nonzero(exact)) * 8
+    compact_bytes = rig.influence_bones.nbytes + rig.influence_weights.nbytes
+
+    frames = np.atleast_1d(frames)
+    bones = fold_bones(params)
+    # 頂点位置の誤差は、量子化だけの影響（切り捨てのない頂点）と切り捨てた頂点に分けて調べる
+    position_error = np.zeros((len(frames), 2), dtype=np.float32)
+    for start in range(0, len(frames), chunk_size):
+        chunk = frames[start:start + chunk_size]
+        reference = evaluate_frames(rest_co, exact, bones, chunk, chunk_size=chunk_size)
+        compact = evaluate_rig(rig, chunk, weights=weights)
+        error = np.linalg.norm(reference - compact, axis=-1)
+        position_error[start:start + len(chunk), 0] = error[:, ~truncated].max(axis=1, initial=0.0)
+        position_error[start:start + len(chunk), 1] = error[:, truncated].max(axis=1, initial=0.0)
+    return {
+        "path": path,
+        "weight_format": rig.weight_format,
+        "vertex_count": vertex_count,
+        "bone_count": bone_count,
+        "file_bytes": os.path.getsize(path),
+        "dense_weight_bytes": dense_bytes,
+        "sparse_weight_bytes": sparse_bytes,
+        "compact_weight_bytes": compact_bytes,
+        "top_k": rig.influence_bones.shape[1],
+        "truncated_vertices": int(np.count_nonzero(truncated)),
+        "max_weight_error": float(np.abs(weights - normalized)[~truncated].max(initial=0.0)),
+        "max_truncated_weight_error": float(np.abs(weights - normalized)[truncated].max(initial=0.0)),
+        "max_position_error": float(position_error[:, 0].max()),
+        "max_truncated_position_error": float(position_error[:, 1].max()),
+        "worst_frame": int(frames[position_error.max(axis=1).argmax()]),
+        "load_time": load_time,
+    }
+
+
+def format_report(report):
+    return "\n".join((
+        f"{report['path']} ({report['weight_format']}): {report['vertex_count']} 頂点, "
+        f"{report['bone_count']} ボーン, ファイル {report['file_bytes'] / 1024:.1f} KiB",
+        f"  ウェイト {report['compact_weight_bytes'] / 1024:.1f} KiB: "
+        f"密な float32 の 1/{report['dense_weight_bytes'] / report['compact_weight_bytes']:.1f}, "
+        f"疎な float32 の 1/{report['sparse_weight_bytes'] / report['compact_weight_bytes']:.1f}",
+        f"  量子化の誤差: ウェイト 最大 {report['max_weight_error']:.5f}, "
+        f"頂点位置 最大 {report['max_position_error']:.5f}",
+        f"  {report['top_k']} 本より多いボーンを持つ頂点 {report['truncated_vertices']} 個: "
+        f"ウェイト 最大 {report['max_truncated_weight_error']:.5f}, "
+        f"頂点位置 最大 {report['max_truncated_position_error']:.5f}"
+        f"（全体で最大のフレーム {report['worst_frame']}）",
+        f"  読み込み（ウェイトと面の展開を含む）: {report['load_time'] * 1000:.2f} ms",
+    ))
+
+
+def main(argv=None):
+    from wrap_params import WrapParams
+
+    parser = argparse.ArgumentParser(description="リグを小さな形式で保存し、float32 との差を調べる")
+    parser.add_argument("output", help="保存するファイル（.wrig）")
+    parser.add_argument("--box", type=float, nargs=3, default=None, metavar=("W", "D", "H"))
+    parser.add_argument("--cuts", type=int, default=60)
+    parser.add_argument("--tessellation", default="uniform", choices=("uniform", "adaptive"))
+    parser.add_argument("--format", default="uint8", choices=WEIGHT_FORMATS, help="ウェイトの形式")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="頂点ごとに残すボーンの数")
+    parser.add_argument("--frame-start", type=int, default=1)
+    parser.add_argument("--frame-end", type=int, default=190)
+    args = parser.parse_args(argv)
+
+    params = WrapParams(number_cuts=args.cuts, tessellation=args.tessellation)
+    if args.box:
+        params = dataclasses.replace(params, box_dims=tuple(args.box))
+
+    start = time.perf_counter()
+    build_rig(args.output, params, args.format, k=args.top_k)
+    print(f"保存: {(time.perf_counter() - start) * 1000:.1f} ms")
+    report = compare_rig(args.output, np.arange(args.frame_start, args.frame_end + 1))
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import dataclasses
+import time
+
+import numpy as np
+
+from paper_mesh import grid_axis, grid_vertices
+from wrap_weights import compute_fold_weights, fold_patches, paper_matrix_world, to_world
+
+
+# 解像度の違う包装紙（LOD）に、基準のグリッドで1回だけ計算したウェイトを移す
+# 基準は包装紙と同じ大きさの一様なグリッド（reference_params の number_cuts、頂点はX方向→Y方向の順）
+# 基準の頂点が規則正しく並んでいるので、KD木で探す代わりに座標からグリッドのマスを直接求める
+#   "nearest"：いちばん近い基準の頂点のウェイト
+#   "barycentric"：マスを2つの三角形に分け、含まれる三角形の3頂点のウェイトを重心座標で補間する
+# ウェイトは側面の領域や折り目の境目（wrap_weights.fold_patches）で不連続なので、補間には移す先の頂点と
+# 同じパッチの基準の頂点だけを使う（別のパッチの頂点は、同じパッチの最も近い基準の頂点に置き換える）
+# bpy には依存しない（座標は包装紙のローカル座標）
+
+TRANSFER_METHODS = ("nearest", "barycentric")
+# ウェイトの移し方を変えたら上げる（scripting.py が古いウェイトの LOD を作り直す）
+# 1：パッチを区別しない、2：同じパッチの基準の頂点だけを使う
+TRANSFER_VERSION = 2
+
+
+def reference_params(params):
+    # ウェイトを計算する基準のグリッド（包装紙と同じ解像度の一様なグリッド）
+    # 包装紙が uniform の場合は包装紙そのものと同じなので、ウェイトキャッシュも共有される
+    return dataclasses.replace(params, tessellation="uniform")
+
+
+def lod_params(params, number_cuts):
+    # LOD の包装紙のパラメータ（解像度だけが違う）
+    return dataclasses.replace(params, number_cuts=number_cuts)
+
+
+def reference_weights(params):
+    # 基準のグリッドの全頂点のウェイト（(R, ボーン数)）
+    vertices = grid_vertices(params.paper_size, params.number_cuts)
+    return compute_fold_weights(to_world(vertices, paper_matrix_world(params)), params)
+
+
+def transfer_weights(weights, params, target_co, method="barycentric"):
+    # 基準のグリッドのウェイト（reference_weights の並び）を target_co の各頂点に移す
+    # 戻り値は (len(target_co), ボーン数) の配列
+    if method not in TRANSFER_METHODS:
+        raise ValueError(f"ウェイトの転送方法は {TRANSFER_METHODS} のどれかです: {method!r}")
+    weights = np.asarray(weights)
+    target_co = np.asarray(target_co, dtype=np.float64).reshape(-1, 3)
+    axis = grid_axis(params.paper_size, params.number_cuts)
+    count = len(axis)
+    if len(weights) != count * count:
+        raise ValueError(f"基準のグリッドの頂点数 {count * count} とウェイトの数 {len(weights)} が違います")
+
+    # グリッドの何マス目か（小数）
+    step = axis[1] - axis[0]
+    fx = np.clip((target_co[:, 0] - axis[0]) / step, 0.0, count - 1)
+    fy = np.clip((target_co[:, 1] - axis[0]) / step, 0.0, count - 1)
+
+    # 基準の頂点と移す先の頂点のパッチ
+    matrix_world = paper_matrix_world(params)
+    reference_co = to_world(grid_vertices(params.paper_size, params.number_cuts), matrix_world)
+    reference_patches = fold_patches(reference_co, params)
+    target_world = to_world(target_co, matrix_world)
+    labels, bands = fold_patches(target_world, params)
+    # 底面の辺の上の頂点（adaptive で折り目の上に置いた頂点）は、回転の丸め誤差で外側の領域に入っても底面にする
+    # （外側でもウェイトはほぼ 0.0 だが、折り目をまたいで補間すると値が付き、正規化で大きく動いてしまう）
+    is_on_bottom = (np.abs(target_world[:, 0]) <= params.half_width + 1e-9) & (
+        np.abs(target_world[:, 1]) <= params.half_depth + 1e-9
+    )
+    labels = np.where(is_on_bottom, -1, labels)
+    bands = np.where(is_on_bottom, 0, bands)
+    patches = (labels, bands)
+
+    if method == "nearest":
+        nodes = np.rint(fy).astype(np.int64) * count + np.rint(fx).astype(np.int64)
+        (nodes,) = _snap_to_patch([nodes], fx, fy, patches, reference_patches, count)
+        return weights[nodes]
+
+    ix = np.minimum(fx.astype(np.int64), count - 2)
+    iy = np.minimum(fy.astype(np.int64), count - 2)
+    tx = (fx - ix)[:, None]
+    ty = (fy - iy)[:, None]
+    v00 = iy * count + ix
+    v00, v10, v01, v11 = _snap_to_patch(
+        [v00, v00 + 1, v00 + count, v00 + count + 1], fx, fy, patches, reference_patches, count,
+    )
+    w00 = weights[v00]
+    w10 = weights[v10]
+    w01 = weights[v01]
+    w11 = weights[v11]
+    # 対角線 (1,0)-(0,1) で分けた下側の三角形 (00, 10, 01) と上側の三角形 (11, 01, 10)
+    lower = tx + ty <= 1.0
+    return np.where(
+        lower,
+        w00 * (1.0 - tx - ty) + w10 * tx + w01 * ty,
+        w11 * (tx + ty - 1.0) + w01 * (1.0 - tx) + w10 * (1.0 - ty),
+    )
+
+
+def _is_same_patch(nodes, reference_patches, labels, bands):
+    # 基準の頂点 nodes のウェイトを、パッチ (labels, bands) の頂点の補間に使えるか
+    # 側面の帯0は底面の頂点も使える（どのボーンのウェイトも折り目で 0.0 なので、底面とつながっている）
+    reference_labels, reference_bands = reference_patches
+    same = (reference_labels[nodes] == labels) & (reference_bands[nodes] == bands)
+    return same | ((bands == 0) & (reference_labels[nodes] == -1))
+
+
+def _snap_to_patch(stencil, fx, fy, patches, reference_patches, count):
+    # stencil（基準の頂点のインデックスの配列のリスト）のうち、移す先の頂点と別のパッチにある頂点を、
+    # 移す先の頂点に最も近い同じパッチの基準の頂点に置き換える（同じパッチの基準の頂点がなければそのまま）
+    labels, bands = patches
+    outside = np.zeros(len(labels), dtype=bool)
+    for nodes in stencil:
+        outside |= ~_is_same_patch(nodes, reference_patches, labels, bands)
+    targets = np.flatnonzero(outside)
+    if len(targets) == 0:
+        return stencil
+    labels = labels[targets]
+    bands = bands[targets]
+    nearest = _nearest_in_patch(fx[targets], fy[targets], labels, bands, reference_patches, count)
+    snapped = []
+    for nodes in stencil:
+        nodes = nodes.copy()
+        replace = ~_is_same_patch(nodes[targets], reference_patches, labels, bands) & (nearest >= 0)
+        nodes[targets[replace]] = nearest[replace]
+        snapped.append(nodes)
+    return snapped
+
+
+def _nearest_in_patch(fx, fy, labels, bands, reference_patches, count):
+    # グリッド上の位置 (fx, fy) に最も近い、パッチ (labels, bands) の基準の頂点のインデックス（なければ -1）
+    # 最も近いグリッドの頂点の周り (2r+1)×(2r+1) から探す。窓の外の頂点は r より遠いので、
+    # r 以内で見つかればそれが最も近い。見つからない頂点だけ r を広げて探し直す
+    nearest = np.full(len(fx), -1, dtype=np.int64)
+    pending = np.arange(len(fx))
+    radius = 1
+    while len(pending):
+        offsets = np.arange(-radius, radius + 1)
+        cx = np.rint(fx[pending]).astype(np.int64)[:, None, None] + offsets[None, None, :]
+        cy = np.rint(fy[pending]).astype(np.int64)[:, None, None] + offsets[None, :, None]
+        nodes = np.clip(cy, 0, count - 1) * count + np.clip(cx, 0, count - 1)
+        valid = (cx >= 0) & (cx < count) & (cy >= 0) & (cy < count)
+        valid &= _is_same_patch(nodes, reference_patches, labels[pending, None, None], bands[pending, None, None])
+        distance = np.where(
+            valid, (cx - fx[pending, None, None]) ** 2 + (cy - fy[pending, None, None]) ** 2, np.inf,
+        ).reshape(len(pending), -1)
+        best = distance.argmin(axis=1)
+        found = distance[np.arange(len(pending)), best] <= radius * radius
+        nearest[pending[found]] = nodes.reshape(len(pending), -1)[found, best[found]]
+        if radius >= count:
+            break
+        pending = pending[~found]
+        radius *= 2
+    return nearest
+
+
+if __name__ == "__main__":
+    from paper_mesh import paper_mesh_arrays
+    from wrap_params import WrapParams
+
+    # 基準のグリッドから各 LOD にウェイトを移す時間と、LOD で直接計算したウェイトとの差
+    params = WrapParams(number_cuts=120)
+    start = time.perf_counter()
+    weights = reference_weights(reference_params(params))
+    print(f"基準 number_cuts={params.number_cuts}: {len(weights)} 頂点, {(time.perf_counter() - start) * 1000:.1f} ms")
+    for cuts in (10, 20, 60, 250):
+        for tessellation in ("uniform", "adaptive"):
+            target = lod_params(dataclasses.replace(params, tessellation=tessellation), cuts)
+            vertices, _ = paper_mesh_arrays(target)
+            exact = compute_fold_weights(to_world(vertices, paper_matrix_world(target)), target)
+            for method in TRANSFER_METHODS:
+                start = time.perf_counter()
+                transferred = transfer_weights(weights, params, vertices, method)
+                elapsed = time.perf_counter() - start
+                error = np.abs(transferred - exact)
+                print(
+                    f"  number_cuts={cuts} ({tessellation}, {method}): {len(vertices)} 頂点, "
+                    f"{elapsed * 1000:.2f} ms, 誤差 平均 {error.mean():.4f} / 最大 {error.max():.3f}"
+                )
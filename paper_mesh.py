@@ -0,0 +1,240 @@
+import time
+
+import numpy as np
+
+from wrap_rig import fold_regions, fold_spec
+from wrap_timeline import KEYFRAMES, animated_bones
+from wrap_weights import FALLOFF_CREASES, paper_matrix_world
+
+
+# 包装紙のグリッドメッシュを NumPy の配列として直接作る
+# primitive_plane_add(size) を subdivide(number_cuts) したものと同じ形（(cuts+2)×(cuts+2) 頂点、
+# (cuts+1)×(cuts+1) 面の四角形グリッド）になる
+# 頂点はX方向→Y方向の順に並ぶ（subdivide の頂点順とは異なるが、ウェイトは座標から計算するので影響しない）
+
+# 頂点の並び・配置を変えたら上げる（ウェイトキャッシュのキーに入れ、古い並びのウェイトを使わないようにする）
+# 1：primitive_plane_add + subdivide、2：NumPy のグリッド（X方向→Y方向の順）
+MESH_LAYOUT_VERSION = 2
+
+
+def grid_axis(size, number_cuts):
+    return np.linspace(-size / 2, size / 2, number_cuts + 2)
+
+
+def grid_vertices(size, number_cuts):
+    # (N, 3) のローカル座標（Z=0の平面）
+    xs = grid_axis(size, number_cuts)
+    return grid_vertices_from_axes(xs, xs)
+
+
+def grid_vertices_from_axes(xs, ys):
+    gx, gy = np.meshgrid(xs, ys)
+    return np.column_stack((gx.ravel(), gy.ravel(), np.zeros(gx.size)))
+
+
+def grid_faces(columns, rows):
+    # columns×rows 頂点のグリッドの四角形（反時計回り、法線は+Z）
+    # 戻り値は (F, 4) の頂点インデックス
+    v = np.arange(columns * rows).reshape(rows, columns)
+    return np.stack(
+        (v[:-1, :-1], v[:-1, 1:], v[1:, 1:], v[1:, :-1]), axis=-1
+    ).reshape(-1, 4)
+
+
+def grid_uvs(vertices, loop_vertex_indices):
+    # ループごとのUV（平面全体を 0〜1 に割り当てる）
+    co = vertices[np.asarray(loop_vertex_indices).ravel(), :2]
+    lo = vertices[:, :2].min(axis=0)
+    span = np.maximum(vertices[:, :2].max(axis=0) - lo, 1e-12)
+    return (co - lo) / span
+
+
+def paper_grid(size, number_cuts):
+    xs = grid_axis(size, number_cuts)
+    return grid_vertices_from_axes(xs, xs), grid_faces(len(xs), len(xs))
+
+
+def flatten_faces(faces):
+    # (F, k) の配列、または頂点数の異なる面のリストを（ループの頂点インデックス, 面ごとの頂点数）にする
+    if isinstance(faces, np.ndarray):
+        return faces.ravel(), np.full(len(faces), faces.shape[1])
+    sizes = np.fromiter((len(face) for face in faces), dtype=np.int64, count=len(faces))
+    loops = np.fromiter((index for face in faces for index in face), dtype=np.int64, count=int(sizes.sum()))
+    return loops, sizes
+
+
+def build_mesh(mesh, vertices, faces, uv_name="UVMap"):
+    # bpy.types.Mesh に頂点・面・UVを foreach_set でまとめて書き込む
+    # （bpy には依存せず、渡された mesh だけを使う）
+    vertices = np.asarray(vertices, dtype=np.float32)
+    loops, sizes = flatten_faces(faces)
+    loop_start = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", vertices.ravel())
+    mesh.loops.add(len(loops))
+    mesh.loops.foreach_set("vertex_index", loops.astype(np.int32))
+    mesh.polygons.add(len(sizes))
+    mesh.polygons.foreach_set("loop_start", loop_start.astype(np.int32))
+    # Blender 4.0 より前は loop_total も書き込む必要がある
+    if not mesh.polygons.bl_rna.properties["loop_total"].is_readonly:
+        mesh.polygons.foreach_set("loop_total", sizes.astype(np.int32))
+    mesh.update(calc_edges=True)
+
+    uv_layer = mesh.uv_layers.new(name=uv_name)
+    uv_layer.data.foreach_set("uv", grid_uvs(vertices, loops).astype(np.float32).ravel())
+    return mesh
+
+
+# --- 折り目に合わせた適応的な分割 ---
+# 包装紙は45度回転しているので、折り目（ワールド座標の x = 一定、y = 一定 の線）は
+# 包装紙のローカル座標では斜めになる。そこでワールド座標のY方向に行を取り、
+# 各行は包装紙の範囲内にあるワールドX方向の列だけを持つメッシュを作る。
+# 行と列の間隔は折り目の近くだけ細かく、それ以外は粗くする。
+
+
+def crease_lines(params, keyframes=KEYFRAMES):
+    # リグが曲げる位置（ワールド座標の X = 一定の線, Y = 一定の線）。ウェイトの勾配が変わる線もここに含める
+    # 各ボーンの領域の辺と減衰の引数から求める（wrap_weights.FALLOFF_CREASES）
+    # keyframes で回転しないボーンの折り目は含めない（曲がらない所まで細かくしない）
+    regions = {region.name: region for region in fold_regions(params)}
+    # 箱の底面の辺（領域の境目でウェイトが変わる）
+    lines = ([-params.half_width, params.half_width], [-params.half_depth, params.half_depth])
+    moving = animated_bones(keyframes)
+    for spec in fold_spec(params):
+        if spec.bone.name not in moving:
+            continue
+        region = regions[spec.region]
+        kind, *args = spec.falloff
+        distances, laterals = FALLOFF_CREASES[kind](*args)
+        lines[region.axis].extend(region.edge + region.side * distance for distance in distances)
+        lines[1 - region.axis].extend(laterals)
+    return tuple(tuple(sorted(set(axis_lines))) for axis_lines in lines)
+
+
+def mesh_layout_key(params):
+    # 頂点の並び・配置を決める値（ウェイトキャッシュのキーと、scripting.py の包装紙のハッシュに使う）
+    # adaptive の頂点は折り目の位置で決まり、折り目はアニメーションで回転するボーンでも変わる
+    if params.tessellation == "adaptive":
+        return [MESH_LAYOUT_VERSION, crease_lines(params)]
+    return [MESH_LAYOUT_VERSION]
+
+
+def adaptive_axis(lo, hi, creases, fine, coarse, band):
+    # lo〜hi の分割位置。折り目から band 以内は fine 間隔、離れるにつれて coarse 間隔まで粗くする
+    # 折り目の位置そのものは必ず分割位置に含める
+    breaks = np.unique(np.clip(np.concatenate(([lo, hi], creases)), lo, hi))
+    # 計算誤差でほぼ同じ位置になった折り目（例：包装紙の角と箱の辺）は1つにまとめる
+    breaks = breaks[np.concatenate(([True], np.diff(breaks) > 1e-9 * max(hi - lo, 1.0)))]
+    breaks[-1] = hi
+    creases = np.asarray(creases, dtype=np.float64)
+
+    def spacing(t):
+        if len(creases) == 0:
+            return np.full_like(t, coarse)
+        distance = np.abs(t[:, None] - creases[None, :]).min(axis=1)
+        return np.clip(fine + (distance - band), fine, coarse)
+
+    positions = [breaks[:1]]
+    for a, b in zip(breaks[:-1], breaks[1:]):
+        t = np.linspace(a, b, 257)
+        density = 1.0 / spacing(t)
+        cumulative = np.concatenate(([0.0], np.cumsum((density[1:] + density[:-1]) / 2 * np.diff(t))))
+        count = max(1, int(np.ceil(cumulative[-1] - 1e-9)))
+        positions.append(np.interp(np.linspace(0.0, cumulative[-1], count + 1)[1:], cumulative, t))
+    return np.concatenate(positions)
+
+
+def _row_interval(corners, y):
+    # 凸多角形（包装紙の四隅）と水平線 Y=y の交わる範囲 [xmin, xmax]
+    xs = []
+    for (x0, y0), (x1, y1) in zip(corners, np.roll(corners, -1, axis=0)):
+        if min(y0, y1) <= y <= max(y0, y1):
+            if y0 == y1:
+                xs.extend((x0, x1))
+            else:
+                xs.append(x0 + (y - y0) * (x1 - x0) / (y1 - y0))
+    return min(xs), max(xs)
+
+
+def _stitch_rows(lower_x, lower_index, upper_x, upper_index, faces):
+    # 隣り合う2行の頂点を、X座標が一致する所は四角形、それ以外は三角形でつなぐ
+    i = j = 0
+    while i < len(lower_x) - 1 or j < len(upper_x) - 1:
+        can_i = i < len(lower_x) - 1
+        can_j = j < len(upper_x) - 1
+        if can_i and can_j and lower_x[i + 1] == upper_x[j + 1]:
+            faces.append((lower_index[i], lower_index[i + 1], upper_index[j + 1], upper_index[j]))
+            i += 1
+            j += 1
+        elif can_i and (not can_j or lower_x[i + 1] < upper_x[j + 1]):
+            faces.append((lower_index[i], lower_index[i + 1], upper_index[j]))
+            i += 1
+        else:
+            faces.append((lower_index[i], upper_index[j + 1], upper_index[j]))
+            j += 1
+
+
+def adaptive_paper_grid(params, coarse_factor=6.0):
+    # 折り目の近くだけ細かい包装紙メッシュ（頂点はローカル座標、面は三角形と四角形の混在）
+    # 細かい部分の間隔は number_cuts の一様グリッドと同じにする
+    matrix_world = paper_matrix_world(params)
+    half = params.paper_size / 2
+    local_corners = np.array([[-half, -half], [half, -half], [half, half], [-half, half]])
+    corners = local_corners @ matrix_world[:2, :2].T + matrix_world[:2, 3]
+
+    fine = params.paper_size / (params.number_cuts + 1)
+    coarse = fine * coarse_factor
+    band = max(params.falloff, fine)
+    crease_xs, crease_ys = crease_lines(params)
+
+    (x_lo, y_lo), (x_hi, y_hi) = corners.min(axis=0), corners.max(axis=0)
+    columns = adaptive_axis(x_lo, x_hi, crease_xs, fine, coarse, band)
+    # 包装紙の角の高さも行に含めて、紙の縁を正確に再現する
+    rows = adaptive_axis(y_lo, y_hi, np.concatenate((crease_ys, corners[:, 1])), fine, coarse, band)
+
+    vertices = []
+    faces = []
+    previous = None
+    eps = 1e-9 * params.paper_size
+    for y in rows:
+        x_min, x_max = _row_interval(corners, y)
+        inner = columns[(columns > x_min + eps) & (columns < x_max - eps)]
+        row_x = np.concatenate(([x_min], inner, [x_max])) if x_max - x_min > eps else np.array([x_min])
+        row_index = np.arange(len(vertices), len(vertices) + len(row_x))
+        vertices.extend((x, y) for x in row_x)
+        if previous is not None:
+            _stitch_rows(previous[0], previous[1], row_x, row_index, faces)
+        previous = (row_x, row_index)
+
+    # ワールド座標から包装紙のローカル座標に戻す
+    world = np.column_stack((np.array(vertices), np.zeros(len(vertices))))
+    inverse = np.linalg.inv(matrix_world)
+    local = world @ inverse[:3, :3].T + inverse[:3, 3]
+    local[:, 2] = 0.0
+    return local, faces
+
+
+def paper_mesh_arrays(params):
+    # params.tessellation に応じた包装紙メッシュの頂点と面
+    if params.tessellation == "adaptive":
+        return adaptive_paper_grid(params)
+    return paper_grid(params.paper_size, params.number_cuts)
+
+
+if __name__ == "__main__":
+    from wrap_params import WrapParams
+
+    # 解像度ごとのメッシュ配列の生成時間（Blenderなしで計測）
+    for cuts in (60, 200, 500):
+        for tessellation in ("uniform", "adaptive"):
+            params = WrapParams(number_cuts=cuts, tessellation=tessellation)
+            start = time.perf_counter()
+            vertices, faces = paper_mesh_arrays(params)
+            loops, sizes = flatten_faces(faces)
+            uvs = grid_uvs(vertices, loops)
+            elapsed = time.perf_counter() - start
+            print(
+                f"number_cuts={cuts} ({tessellation}): {len(vertices)} 頂点, {len(sizes)} 面, "
+                f"{elapsed * 1000:.1f} ms"
+            )
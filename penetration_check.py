@@ -0,0 +1,204 @@
+import argparse
+import time
+
+import numpy as np
+
+from wrap_timeline import KEYFRAMES, keyframe_channels
+
+
+# 包装紙が箱にめり込んでいないかを、全フレーム・全頂点でまとめて調べる
+# 箱は box_dims の直方体（底面の中心が原点）で、箱の符号付き距離（外側が正、内側が負）の
+# 負の部分をめり込みの深さとする
+# 座標は焼き込んだキャッシュ（vertex_cache）か、Blenderなしの変形計算（wrap_skinning）から受け取る
+#
+#   python penetration_check.py                          # 既定の寸法で全フレームを調べる
+#   python penetration_check.py --cache bake/WrappingPaper.vcache
+#   python penetration_check.py --tune FoldBone_Left_Middle 0 150 20 30 40 50 60
+
+# 箱の面に沿わせた包装紙の計算誤差（float32）はめり込みとみなさない
+DEFAULT_TOLERANCE = 1e-3
+# フレームごとに報告する、めり込みの深い頂点の数
+WORST_VERTICES = 8
+
+
+def box_sdf(co, box_dims):
+    # (..., 3) のワールド座標の、箱からの符号付き距離
+    half = np.asarray(box_dims, dtype=np.float32) / 2
+    center = np.array([0.0, 0.0, half[2]], dtype=np.float32)
+    q = np.abs(np.asarray(co, dtype=np.float32) - center) - half
+    outside = np.sqrt((np.maximum(q, 0.0) ** 2).sum(axis=-1))
+    inside = np.minimum(q.max(axis=-1), 0.0)
+    return outside + inside
+
+
+def check_frames(world_co, box_dims, frames, tolerance=DEFAULT_TOLERANCE, worst=WORST_VERTICES):
+    # (F, N, 3) の座標のフレームごとのめり込み
+    # 戻り値はフレームごとの {"frame", "max_depth", "total_depth", "vertex_count", "worst": [[頂点, 深さ], ...]}
+    # total_depth は全頂点のめり込みの深さの合計
+    depth = np.maximum(-box_sdf(world_co, box_dims), 0.0)
+    depth[depth <= tolerance] = 0.0
+    max_depth = depth.max(axis=1)
+    total_depth = depth.sum(axis=1)
+    vertex_counts = np.count_nonzero(depth, axis=1)
+    records = []
+    for frame, frame_depth, frame_max, frame_total, vertex_count in zip(
+        frames, depth, max_depth, total_depth, vertex_counts
+    ):
+        record = {
+            "frame": int(frame),
+            "max_depth": float(frame_max),
+            "total_depth": float(frame_total),
+            "vertex_count": int(vertex_count),
+            "worst": [],
+        }
+        if vertex_count:
+            count = min(worst, int(vertex_count))
+            indices = np.argpartition(frame_depth, -count)[-count:]
+            indices = indices[np.argsort(frame_depth[indices])[::-1]]
+            record["worst"] = [[int(index), float(frame_depth[index])] for index in indices]
+        records.append(record)
+    return records
+
+
+def summarize(records):
+    # 全フレームでいちばん深いめり込みと、めり込みのあるフレーム
+    worst = max(records, key=lambda record: record["max_depth"], default=None)
+    return {
+        "max_depth": worst["max_depth"] if worst else 0.0,
+        "worst_frame": worst["frame"] if worst and worst["max_depth"] > 0.0 else None,
+        "total_depth": sum(record["total_depth"] for record in records),
+        "penetrating_frames": [record["frame"] for record in records if record["max_depth"] > 0.0],
+        "frames": records,
+    }
+
+
+def check_cache(path, params, tolerance=DEFAULT_TOLERANCE, chunk_size=32):
+    # 焼き込んだキャッシュ（ローカル座標）を chunk_size フレームずつワールド座標に戻して調べる
+    from vertex_cache import open_vertex_cache
+    from wrap_weights import paper_matrix_world
+
+    header, data = open_vertex_cache(path)
+    matrix_world = paper_matrix_world(params).astype(np.float32)
+    records = []
+    for start in range(0, header["frame_count"], chunk_size):
+        local = data[start:start + chunk_size]
+        world = local @ matrix_world[:3, :3].T + matrix_world[:3, 3]
+        frames = np.arange(start, start + len(local)) + header["frame_start"]
+        records += check_frames(world, params.box_dims, frames, tolerance)
+    return summarize(records)
+
+
+def prepare_rig(params):
+    # 変形計算に使う（レスト位置のワールド座標, スパースなウェイト, ボーン）
+    from paper_mesh import paper_mesh_arrays
+    from wrap_rig import fold_bones
+    from wrap_weights import compute_fold_weights, paper_matrix_world, to_sparse, to_world
+
+    vertices, _ = paper_mesh_arrays(params)
+    rest_co = to_world(vertices, paper_matrix_world(params))
+    return rest_co, to_sparse(compute_fold_weights(rest_co, params)), fold_bones(params)
+
+
+def check_rig(params, frames, keyframes=KEYFRAMES, tolerance=DEFAULT_TOLERANCE, chunk_size=32, rig=None):
+    # Blenderなしの変形計算で frames の各フレームを調べる（rig は prepare_rig() の結果を使い回す時に渡す）
+    from wrap_skinning import evaluate_frames
+
+    rest_co, weights, bones = rig or prepare_rig(params)
+    frames = np.atleast_1d(frames)
+    records = []
+    for start in range(0, len(frames), chunk_size):
+        chunk = frames[start:start + chunk_size]
+        world = evaluate_frames(rest_co, weights, bones, chunk, keyframes=keyframes, chunk_size=chunk_size)
+        records += check_frames(world, params.box_dims, chunk, tolerance)
+    return summarize(records)
+
+
+def replace_keyframe(keyframes, bone, axis, frame, angle):
+    # (bone, axis, frame) のキーの角度を置き換えた表
+    rows = [row for row in keyframes if row[:3] != (bone, axis, frame)]
+    if len(rows) == len(keyframes):
+        raise ValueError(f"キーフレームがありません: {bone} 軸{axis} フレーム{frame}")
+    return tuple(rows) + ((bone, axis, frame, angle),)
+
+
+def affected_frames(keyframes, bone, axis, frame):
+    # キーの角度を変えた時に変わりうるフレーム
+    # （自動クランプのハンドルは前後のキーにも影響するので、前後2つ先のキーまで）
+    keys = [key_frame for key_frame, _ in keyframe_channels(keyframes)[(bone, axis)]]
+    index = keys.index(frame)
+    return np.arange(keys[max(index - 2, 0)], keys[min(index + 2, len(keys) - 1)] + 1)
+
+
+def tune_keyframe(params, bone, axis, frame, angles, keyframes=KEYFRAMES, tolerance=DEFAULT_TOLERANCE):
+    # (bone, axis, frame) のキーの角度を angles の各値にした時の、影響するフレームでのめり込み
+    # 戻り値は [(角度, めり込みの合計, 最大のめり込み)] を、めり込みの合計が小さい順
+    # （同じなら元の角度に近い順）に並べたもの
+    # （最大のめり込みは別の折り目で決まっていて角度を変えても変わらないことがあるので、合計で比べる）
+    original = dict(((row[0], row[1], row[2]), row[3]) for row in keyframes)[(bone, axis, frame)]
+    frames = affected_frames(keyframes, bone, axis, frame)
+    rig = prepare_rig(params)
+    results = []
+    for angle in angles:
+        report = check_rig(
+            params, frames, replace_keyframe(keyframes, bone, axis, frame, angle), tolerance, rig=rig
+        )
+        results.append((angle, report["total_depth"], report["max_depth"]))
+    return sorted(results, key=lambda result: (result[1], abs(result[0] - original)))
+
+
+def format_report(report, limit=20):
+    lines = [
+        f"最大のめり込み {report['max_depth']:.4f}"
+        + (f"（フレーム {report['worst_frame']}）" if report["worst_frame"] is not None else "")
+        + f", 合計 {report['total_depth']:.2f}"
+        + f", めり込みのあるフレーム {len(report['penetrating_frames'])} / {len(report['frames'])}"
+    ]
+    penetrating = [record for record in report["frames"] if record["max_depth"] > 0.0]
+    for record in sorted(penetrating, key=lambda record: -record["max_depth"])[:limit]:
+        worst = ", ".join(f"{index}:{depth:.4f}" for index, depth in record["worst"])
+        lines.append(
+            f"  フレーム {record['frame']}: 最大 {record['max_depth']:.4f}, "
+            f"{record['vertex_count']} 頂点 (頂点:深さ {worst})"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    from wrap_params import WrapParams
+
+    parser = argparse.ArgumentParser(description="包装紙と箱のめり込みを全フレームで調べる")
+    parser.add_argument("--box", type=float, nargs=3, default=None, metavar=("W", "D", "H"))
+    parser.add_argument("--cuts", type=int, default=60)
+    parser.add_argument("--frame-start", type=int, default=1)
+    parser.add_argument("--frame-end", type=int, default=190)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--cache", default=None, help="焼き込んだキャッシュ（.vcache）を調べる")
+    parser.add_argument(
+        "--tune", nargs="+", default=None, metavar="ARG",
+        help="ボーン 軸 フレーム 角度... （キーの角度の候補ごとにめり込みを調べる）",
+    )
+    args = parser.parse_args(argv)
+
+    params = WrapParams(number_cuts=args.cuts)
+    if args.box:
+        params = WrapParams(box_dims=tuple(args.box), number_cuts=args.cuts)
+
+    start = time.perf_counter()
+    if args.tune:
+        bone, axis, frame, *angles = args.tune
+        results = tune_keyframe(
+            params, bone, int(axis), int(frame), [float(angle) for angle in angles], tolerance=args.tolerance
+        )
+        for angle, total_depth, max_depth in results:
+            print(f"  {angle:7.1f} 度: めり込みの合計 {total_depth:.2f}, 最大 {max_depth:.4f}")
+        print(f"最適な角度: {results[0][0]:.1f} 度")
+    elif args.cache:
+        print(format_report(check_cache(args.cache, params, args.tolerance)))
+    else:
+        frames = np.arange(args.frame_start, args.frame_end + 1)
+        print(format_report(check_rig(params, frames, tolerance=args.tolerance)))
+    print(f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import argparse
+import importlib
+import json
+import os
+import struct
+import subprocess
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+# フレーム範囲を分割（シャード）して、ローカルのワーカープロセスで並列にレンダリングする
+#
+#   python render_frames.py --out renders/ --renderer stub                    # Blenderなしで試す
+#   python render_frames.py scene.blend --out renders/ --renderer blender --blender /path/to/blender
+#
+# 出力先に既にあるフレームは飛ばすので、途中で止まっても同じコマンドで続きから再開できる
+# （書き込み中のファイルは .part の名前で書き、書き終わってから名前を変える）
+# フレームごとのレンダリング時間は出力先の render_log.jsonl に1行ずつ追記する
+# レンダラーは render(frame, path) を持つクラスで、--renderer に "モジュール:クラス" を指定して差し替えられる
+
+FRAME_PATTERN = "frame_{frame:04d}.png"
+LOG_NAME = "render_log.jsonl"
+# render_worker.py が結果の JSON を出力する行の先頭
+RESULT_PREFIX = "RENDER_RESULT "
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+# --- レンダラー ---
+
+def write_png(path, width, height, rgb):
+    # 単色の PNG（8bit RGB）を書き出す
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    row = b"\0" + bytes(rgb) * width
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(row * height)))
+        f.write(chunk(b"IEND", b""))
+
+
+class StubRenderer:
+    # Blenderなしでスケジューラーを試すためのレンダラー
+    # delay 秒待ってから、フレーム番号で色を変えた小さな PNG を書き出す
+
+    def __init__(self, delay=0.0, size=16):
+        self.delay = float(delay)
+        self.size = int(size)
+
+    def render(self, frame, path):
+        if self.delay:
+            time.sleep(self.delay)
+        write_png(path, self.size, self.size, (frame % 256, (frame * 7) % 256, (frame * 13) % 256))
+
+    def close(self):
+        pass
+
+
+class BlenderRenderer:
+    # バックグラウンドの Blender を1つ起動して、.blend のフレームを1枚ずつレンダリングする
+    #   blender --background scene.blend --python render_worker.py
+    # 標準入力に1行1フレーム（JSON）を送り、結果の行（RESULT_PREFIX）を待つ
+
+    def __init__(self, blend_path, blender_path="blender"):
+        self.blend_path = blend_path
+        self.blender_path = blender_path
+        self._process = None
+
+    def _start(self):
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                [
+                    self.blender_path, "--background", self.blend_path,
+                    "--python", os.path.join(script_dir, "render_worker.py"),
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+            )
+        return self._process
+
+    def render(self, frame, path):
+        process = self._start()
+        process.stdin.write(json.dumps({"frame": frame, "output": path}) + "\n")
+        process.stdin.flush()
+        for line in process.stdout:
+            if line.startswith(RESULT_PREFIX):
+                result = json.loads(line[len(RESULT_PREFIX):])
+                if not result["ok"]:
+                    raise RuntimeError(result["error"])
+                return
+        raise RuntimeError("Blender が終了しました")
+
+    def close(self):
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process = None
+
+
+RENDERERS = {
+    "stub": StubRenderer,
+    "blender": BlenderRenderer,
+}
+
+
+def make_renderer(name, options):
+    # "stub" / "blender"、または "モジュール:クラス" からレンダラーを作る
+    if ":" in name:
+        module_name, attribute = name.split(":", 1)
+        factory = getattr(importlib.import_module(module_name), attribute)
+    else:
+        factory = RENDERERS[name]
+    return factory(**options)
+
+
+# --- スケジューラー ---
+
+def frame_path(out_dir, frame, pattern=FRAME_PATTERN):
+    return os.path.join(out_dir, pattern.format(frame=frame))
+
+
+def pending_frames(out_dir, frames, pattern=FRAME_PATTERN):
+    # 出力がまだない（または空の）フレーム
+    return [
+        frame for frame in frames
+        if not os.path.exists(frame_path(out_dir, frame, pattern))
+        or os.path.getsize(frame_path(out_dir, frame, pattern)) == 0
+    ]
+
+
+def make_shards(frames, shard_size):
+    # 連続する shard_size フレームずつに分ける
+    return [frames[start:start + shard_size] for start in range(0, len(frames), shard_size)]
+
+
+# ワーカープロセスごとのレンダラー（最初のシャードで作り、以降のシャードでも使い回す）
+_renderer = None
+
+
+def _worker_renderer(renderer_name, options):
+    global _renderer
+    if _renderer is None:
+        _renderer = make_renderer(renderer_name, options)
+    return _renderer
+
+
+def render_shard(task):
+    # 1つのシャードのフレームを順にレンダリングし、フレームごとの記録を返す
+    renderer = _worker_renderer(task["renderer"], task["options"])
+    records = []
+    for frame in task["frames"]:
+        output = frame_path(task["out_dir"], frame, task["pattern"])
+        part = output + ".part"
+        start = time.perf_counter()
+        try:
+            renderer.render(frame, part)
+            os.replace(part, output)
+            record = {"frame": frame, "ok": True, "seconds": time.perf_counter() - start}
+        except Exception as error:
+            record = {"frame": frame, "ok": False, "seconds": time.perf_counter() - start, "error": repr(error)}
+        record.update(shard=task["shard"], pid=os.getpid(), finished=time.time())
+        # 止まっても途中までの記録が残るように、1フレームごとに追記する
+        with open(os.path.join(task["out_dir"], LOG_NAME), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        records.append(record)
+    return records
+
+
+def render_frames(
+    out_dir, frame_start, frame_end, renderer="stub", options=None, workers=None, shard_size=10,
+    pattern=FRAME_PATTERN,
+):
+    # 出力のないフレームだけをシャードに分けて、ワーカーで並列にレンダリングする
+    # 戻り値は（フレームごとの記録, 飛ばしたフレーム数, 経過時間[秒]）
+    os.makedirs(out_dir, exist_ok=True)
+    frames = list(range(frame_start, frame_end + 1))
+    pending = pending_frames(out_dir, frames, pattern)
+    tasks = [
+        {
+            "shard": index,
+            "frames": shard,
+            "out_dir": os.path.abspath(out_dir),
+            "pattern": pattern,
+            "renderer": renderer,
+            "options": options or {},
+        }
+        for index, shard in enumerate(make_shards(pending, shard_size))
+    ]
+
+    start = time.perf_counter()
+    records = []
+    if tasks:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(tasks))) as pool:
+            futures = [pool.submit(render_shard, task) for task in tasks]
+            for future in as_completed(futures):
+                shard_records = future.result()
+                records += shard_records
+                done = sum(record["ok"] for record in records)
+                print(f"シャード {shard_records[0]['shard']} 完了: {done}/{len(pending)} フレーム", flush=True)
+    return sorted(records, key=lambda record: record["frame"]), len(frames) - len(pending), time.perf_counter() - start
+
+
+def summarize(records, skipped, elapsed):
+    # スループット（frames/min）、1フレームの時間、ワーカーごとのフレーム数
+    rendered = [record for record in records if record["ok"]]
+    lines = [
+        f"フレーム: {len(rendered)} 枚レンダリング, {skipped} 枚は出力済みのため省略, "
+        f"{elapsed:.1f} 秒, {len(rendered) / elapsed * 60 if elapsed else 0:.1f} frames/min",
+    ]
+    if rendered:
+        seconds = sorted(record["seconds"] for record in rendered)
+        lines.append(
+            f"  1フレーム: 平均 {sum(seconds) / len(seconds) * 1000:.1f} ms, "
+            f"中央値 {seconds[len(seconds) // 2] * 1000:.1f} ms, 最大 {seconds[-1] * 1000:.1f} ms"
+        )
+        per_worker = defaultdict(int)
+        for record in rendered:
+            per_worker[record["pid"]] += 1
+        lines.append(f"  ワーカー {len(per_worker)} 個: " + ", ".join(str(count) for count in per_worker.values()))
+    for record in records:
+        if not record["ok"]:
+            lines.append(f"  失敗 フレーム {record['frame']}: {record['error']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="フレームを分割して並列にレンダリングする（再開可能）")
+    parser.add_argument("blend", nargs="?", default=None, help="レンダリングする .blend（blender レンダラーの時）")
+    parser.add_argument("--out", default="renders", help="出力フォルダ")
+    parser.add_argument("--frame-start", type=int, default=1)
+    parser.add_argument("--frame-end", type=int, default=190)
+    parser.add_argument("--workers", type=int, default=None, help="ワーカー数（既定は CPU コア数）")
+    parser.add_argument("--shard-size", type=int, default=10, help="1つのシャードのフレーム数")
+    parser.add_argument("--pattern", default=FRAME_PATTERN, help="出力ファイル名（{frame} がフレーム番号）")
+    parser.add_argument("--renderer", default="stub", help="stub / blender / モジュール:クラス")
+    parser.add_argument("--blender", default="blender", help="Blender の実行ファイル")
+    parser.add_argument("--stub-delay", type=float, default=0.0, help="stub レンダラーの1フレームの待ち時間[秒]")
+    args = parser.parse_args(argv)
+
+    if args.renderer == "blender":
+        if args.blend is None:
+            parser.error("blender レンダラーには .blend の指定が必要です")
+        options = {"blend_path": os.path.abspath(args.blend), "blender_path": args.blender}
+    elif args.renderer == "stub":
+        options = {"delay": args.stub_delay}
+    else:
+        options = {}
+
+    records, skipped, elapsed = render_frames(
+        args.out,
+        args.frame_start,
+        args.frame_end,
+        renderer=args.renderer,
+        options=options,
+        workers=args.workers,
+        shard_size=args.shard_size,
+        pattern=args.pattern,
+    )
+    print(summarize(records, skipped, elapsed))
+
+
+if __name__ == "__main__":
+    main()
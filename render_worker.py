@@ -0,0 +1,37 @@
+import json
+import os
+import sys
+import time
+import traceback
+
+import bpy
+
+
+# render_frames.py の BlenderRenderer から起動されるバックグラウンドの Blender ワーカー
+#   blender --background scene.blend --python render_worker.py
+# 標準入力から1行1フレーム（JSON：frame, output）を受け取り、そのフレームを output にレンダリングする
+# Blender の起動と .blend の読み込みは1回だけで、同じプロセスで次々にフレームを処理する
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+
+from render_frames import RESULT_PREFIX
+
+scene = bpy.context.scene
+# 出力ファイル名は render_frames.py が決める（拡張子を付け足さない）
+scene.render.use_file_extension = False
+
+for line in sys.stdin:
+    if not line.strip():
+        continue
+    request = json.loads(line)
+    start = time.perf_counter()
+    try:
+        scene.frame_set(request["frame"])
+        scene.render.filepath = request["output"]
+        bpy.ops.render.render(write_still=True)
+        result = {"frame": request["frame"], "ok": True, "seconds": time.perf_counter() - start}
+    except Exception:
+        result = {"frame": request.get("frame"), "ok": False, "error": traceback.format_exc()}
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
@@ -0,0 +1,85 @@
+import hashlib
+import json
+
+
+# scripting.py を同じ Blender のセッションで繰り返し実行する時に、変わったオブジェクトだけを作り直すための補助
+# 作ったオブジェクトには、そのオブジェクトを決めるパラメータのハッシュをカスタムプロパティとして保存しておき、
+# 次の実行でハッシュが同じならそのまま使う
+# bpy には依存しない（bpy.data を引数で受け取る）
+
+# 作り方を変えた時に上げる（前回のセッションで作ったオブジェクトを使わないようにする）
+BUILD_VERSION = 3
+BUILD_HASH_KEY = "wrap_build_hash"
+
+# オブジェクトの種類ごとのデータブロックのコレクション名
+DATA_COLLECTIONS = {
+    "MESH": "meshes",
+    "ARMATURE": "armatures",
+    "CAMERA": "cameras",
+    "LIGHT": "lights",
+}
+
+
+def build_hash(*parts):
+    # JSON にできる値（数値、文字列、リスト、辞書）からハッシュを作る
+    text = json.dumps([BUILD_VERSION, *parts], sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def remove_object(data, obj):
+    # オブジェクトを削除し、ほかに使われていなければそのデータ（メッシュなど）も削除する
+    # （データが残ると、作り直したデータの名前が "WrappingPaper.001" のようにずれる）
+    obj_data = obj.data
+    collection_name = DATA_COLLECTIONS.get(obj.type)
+    data.objects.remove(obj, do_unlink=True)
+    if obj_data is not None and collection_name is not None and obj_data.users == 0:
+        getattr(data, collection_name).remove(obj_data)
+
+
+def remove_unused(collection, name):
+    # 使われていない同じ名前のデータブロック（前回のアクションやマテリアルなど）があれば削除する
+    block = collection.get(name)
+    if block is not None and block.users == 0:
+        collection.remove(block)
+
+
+def reuse_object(data, name, digest, key=BUILD_HASH_KEY):
+    # 同じ名前で同じハッシュのオブジェクトがあればそれを返す
+    # ハッシュが違う（または digest が None の）時は、古いオブジェクトを削除して None を返す
+    obj = data.objects.get(name)
+    if obj is None:
+        return None
+    if digest is not None and obj.get(key) == digest:
+        return obj
+    remove_object(data, obj)
+    return None
+
+
+def remove_objects_except(data, objects, keep_names):
+    # keep_names 以外のオブジェクトを削除し、削除した数を返す
+    removed = 0
+    for obj in list(objects):
+        if obj.name not in keep_names:
+            remove_object(data, obj)
+            removed += 1
+    return removed
+
+
+def purge_orphans(data):
+    # どこからも使われていないデータブロック（前回までのメッシュ、アーマチュア、アクション、マテリアルなど）を削除する
+    if hasattr(data, "orphans_purge"):
+        return data.orphans_purge(do_local_ids=True, do_linked_ids=False, do_recursive=True)
+    # orphans_purge() がない古い Blender では、使われなくなったものがなくなるまで繰り返す
+    removed = 0
+    while True:
+        orphans = [
+            (collection, block)
+            for collection in (data.meshes, data.armatures, data.actions, data.materials, data.cameras, data.lights)
+            for block in collection
+            if block.users == 0
+        ]
+        if not orphans:
+            return removed
+        for collection, block in orphans:
+            collection.remove(block)
+        removed += len(orphans)
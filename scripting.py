@@ -1,446 +1,487 @@
 import bpy
 import math
-
-# 0. 初期設定（既存のオブジェクトを全て削除）
-bpy.ops.object.select_all(action='SELECT')
-bpy.ops.object.delete()
+import os
+import sys
+import time
+
+import numpy as np
+
+# 同じフォルダにある補助モジュールを読み込めるようにする
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+
+from dataclasses import asdict
+from functools import partial
+
+from paper_lod import TRANSFER_VERSION, lod_params, reference_params, reference_weights, transfer_weights
+from paper_mesh import build_mesh, mesh_layout_key, paper_mesh_arrays
+from scene_state import BUILD_HASH_KEY, build_hash, purge_orphans, remove_object, remove_objects_except, remove_unused, reuse_object
+from stage_timer import StageTimer
+from vertex_cache import bake, export_pc2, read_time_per_frame
+from weight_cache import WeightCache
+from wrap_params import WrapParams
+from wrap_rig import fold_bones
+from wrap_timeline import KEYFRAMES, apply_timeline
+from wrap_weights import BONE_NAMES, assign_vertex_groups, compute_fold_weights, membership_count, to_world
+
+# バッチ処理（batch_wrap.py）から実行された場合は、ジョブの値で寸法などを上書きする
+wrap_job = globals().get("WRAP_JOB", {})
+
+# ステップごとの時間と件数を記録して reports/stage_report.json に保存する
+# PROFILE_STAGES を True にすると、ステップごとの cProfile の結果も profiles/ に保存する
+PROFILE_STAGES = wrap_job.get("profile", False)
+stage_timer = StageTimer(
+    profile=PROFILE_STAGES,
+    profile_dir=os.path.join(script_dir, "profiles"),
+    track_memory=wrap_job.get("track_memory", False),
+)
+
+# 表示用の軽い包装紙（LOD）：{名前: number_cuts}。空にすると作らない
+# 例えば {"Viewport": 20} なら "WrappingPaper_Viewport" を作り、ビューレイヤー "Paper_Viewport" で使う
+PAPER_LODS = wrap_job.get("paper_lods", {"Viewport": 20})
+# LOD へのウェイトの移し方（"nearest" または "barycentric"、paper_lod.transfer_weights を参照）
+LOD_TRANSFER = wrap_job.get("lod_transfer", "barycentric")
+
+# 0. 初期設定
+# INCREMENTAL_BUILD が True の時は、前回の実行で作ったオブジェクトのうち、パラメータ（ハッシュ）が
+# 変わっていないものはそのまま使い、変わったものだけを作り直す
+# （キーフレームの角度だけを変えた時は、包装紙・ウェイト・骨格はそのままでアクションだけを作り直す）
+# False の時は以前と同じく既存のオブジェクトを全て削除して作り直す
+stage_timer.begin("clear_scene")
+INCREMENTAL_BUILD = wrap_job.get("incremental", True)
+SCENE_OBJECTS = ("Box", "WrappingPaper", "WrappingArmature", "Camera", "Light") + tuple(
+    f"WrappingPaper_{name}" for name in PAPER_LODS
+)
+if INCREMENTAL_BUILD:
+    # このスクリプトで作るもの以外を削除する
+    stage_timer.count(removed=remove_objects_except(bpy.data, bpy.context.scene.objects, SCENE_OBJECTS))
+else:
+    # select_all / delete はアクティブなビューレイヤーのオブジェクトにしか届かず、ほかのビューレイヤーで
+    # 使う LOD（"Paper_<名前>" のコレクション）が残って "WrappingPaper_Viewport.001" ができるので、
+    # シーンのオブジェクトと、このスクリプトで作る名前のオブジェクトを bpy.data から直接削除する
+    for obj in list(bpy.data.objects):
+        if (
+            obj.name in bpy.context.scene.objects
+            or obj.name in SCENE_OBJECTS
+            or obj.name.startswith("WrappingPaper_")
+        ):
+            remove_object(bpy.data, obj)
+
+
+def current_object(name, digest):
+    # 作り直さずに使えるオブジェクトを返す（なければ None、古いものは削除される）
+    obj = reuse_object(bpy.data, name, digest) if INCREMENTAL_BUILD else None
+    if obj is not None:
+        stage_timer.count(reused=1)
+    return obj
 
 # --- ステップ1：シーンの準備 ---
 
 # 1. 箱を作成（通常の向きで配置）
-box_dims = (3, 2, 1.5)  # 箱の寸法（幅、奥行き、高さ）
-bpy.ops.mesh.primitive_cube_add(size=1, location=(0, 0, box_dims[2] / 2))
-box = bpy.context.active_object
-box.name = "Box"
-box.scale = (box_dims[0], box_dims[1], box_dims[2])
-bpy.ops.object.transform_apply(scale=True)
+stage_timer.begin("box")
+box_dims = tuple(wrap_job.get("box_dims", (3, 2, 1.5)))  # 箱の寸法（幅、奥行き、高さ）
+box_color = tuple(wrap_job.get("box_color", (0.8, 0.8, 0.8, 1.0)))  # 箱のマテリアルの色（RGBA）
+box_hash = build_hash("box", box_dims, box_color)
+box = current_object("Box", box_hash)
+if box is None:
+    bpy.ops.mesh.primitive_cube_add(size=1, location=(0, 0, box_dims[2] / 2))
+    box = bpy.context.active_object
+    box.name = "Box"
+    box.scale = (box_dims[0], box_dims[1], box_dims[2])
+    bpy.ops.object.transform_apply(scale=True)
+
+    remove_unused(bpy.data.materials, "BoxMaterial")
+    box_material = bpy.data.materials.new("BoxMaterial")
+    box_material.diffuse_color = box_color
+    box_material.use_nodes = True
+    box_material.node_tree.nodes["Principled BSDF"].inputs["Base Color"].default_value = box_color
+    box.data.materials.append(box_material)
+    box[BUILD_HASH_KEY] = box_hash
 
 # 2. 包装紙（平面）を作成（45度回転させる）
-paper_size = 8
+paper_size = wrap_job.get("paper_size", 8)
 # 包装紙を箱の底面の高さ（Z=0）に配置、少し左と手前に移動
-paper_offset_x = -1.0  # 左に移動する量
-paper_offset_y = -1.0  # 手前に移動する量
-bpy.ops.mesh.primitive_plane_add(size=paper_size, location=(paper_offset_x, paper_offset_y, 0))
-paper = bpy.context.active_object
-paper.name = "WrappingPaper"
-paper.rotation_euler[2] = math.radians(45)  # Z軸で45度回転（斜め配置）
-
-# 細かく曲げられるように、メッシュを細分化
-bpy.ops.object.mode_set(mode='EDIT')
-bpy.ops.mesh.subdivide(number_cuts=60)
-bpy.ops.object.mode_set(mode='OBJECT')
+paper_offset_x = wrap_job.get("paper_offset_x", -1.0)  # 左に移動する量
+paper_offset_y = wrap_job.get("paper_offset_y", -1.0)  # 手前に移動する量
+number_cuts = wrap_job.get("number_cuts", 60)
+# "uniform"：一様な細分化、"adaptive"：折り目の近くだけ細かく分割する（頂点数が数分の1になる）
+tessellation = wrap_job.get("tessellation", "uniform")
+# True にすると、頂点グループの登録数とフレームごとの変形の評価時間を
+# 「全頂点を登録した場合」と「ウェイト0を登録しない場合」で比較して表示する
+REPORT_VERTEX_GROUP_STATS = wrap_job.get("report_vertex_group_stats", False)
+# True にすると、包装紙の変形を全フレーム分 bake/ フォルダに焼き込み、PC2 形式でも書き出す
+BAKE_VERTEX_CACHE = wrap_job.get("bake_vertex_cache", False)
+# True にすると（BAKE_VERTEX_CACHE も True の時）、アーマチュアモディファイアの代わりに
+# 焼き込んだキャッシュを Mesh Cache モディファイアで再生する
+USE_BAKED_CACHE = wrap_job.get("use_baked_cache", False)
+wrap_params = WrapParams(
+    box_dims=box_dims,
+    paper_size=paper_size,
+    paper_offset_x=paper_offset_x,
+    paper_offset_y=paper_offset_y,
+    number_cuts=number_cuts,
+    tessellation=tessellation,
+)
+# 細かく曲げられるように、細分化済みのグリッドを頂点・面の配列から直接作る
+# （uniform の場合は primitive_plane_add ＋ subdivide(number_cuts) と同じ形のメッシュ）
+# 包装紙のハッシュには箱の寸法も含まれる（ウェイトが箱の寸法で決まるため）
+# adaptive の場合は折り目の位置（paper_mesh.mesh_layout_key）も含める（頂点の配置が変わるため）
+# 焼き込んだキャッシュを再生する場合はモディファイアを差し替えるので、毎回作り直す
+stage_timer.begin("paper_mesh")
+paper_hash = (
+    None if BAKE_VERTEX_CACHE and USE_BAKED_CACHE
+    else build_hash("paper", asdict(wrap_params), mesh_layout_key(wrap_params))
+)
+paper = current_object("WrappingPaper", paper_hash)
+paper_built = paper is None
+if paper_built:
+    paper_vertices, paper_faces = paper_mesh_arrays(wrap_params)
+    paper_mesh = build_mesh(bpy.data.meshes.new("WrappingPaper"), paper_vertices, paper_faces)
+    paper = bpy.data.objects.new("WrappingPaper", paper_mesh)
+    bpy.context.collection.objects.link(paper)
+    paper.location = (paper_offset_x, paper_offset_y, 0)
+    paper.rotation_euler[2] = math.radians(45)  # Z軸で45度回転（斜め配置）
+    bpy.context.view_layer.update()
+stage_timer.count(vertices=len(paper.data.vertices), faces=len(paper.data.polygons))
 
 
 # --- ステップ2：骨格（アーマチュア）の作成 ---
 
 # 1. アーマチュアオブジェクトを作成
-bpy.ops.object.armature_add(enter_editmode=True, location=(0, 0, 0))
-armature = bpy.context.active_object
-armature.name = "WrappingArmature"
-
-# 最初のボーンを削除
-bpy.ops.armature.select_all(action='SELECT')
-bpy.ops.armature.delete()
-
-# 商品の辺と包装紙の角の位置を計算
-half_width = box_dims[0] / 2
-half_depth = box_dims[1] / 2
-
-# 包装紙が45度回転しているので、手前の角は (0, -paper_size/2, 0) の位置にある
-paper_corner_y = -paper_size / 2
-box_height = box_dims[2]
-
-# === 手前の面：商品の手前の辺（底面）から上面までの折り目 ===
-bone_front_bottom = armature.data.edit_bones.new("FoldBone_Front_Bottom")
-bone_front_bottom.head = (0, -half_depth, 0)           # ボーンの根本：商品の手前の辺の中心（底面）
-bone_front_bottom.tail = (0, -half_depth, box_height)  # ボーンの先端：商品の手前の辺の上面
-
-# 商品の上面から包装紙の先端までの折り目（親子関係を設定）
-bone_front_top = armature.data.edit_bones.new("FoldBone_Front_Top")
-bone_front_top.head = (0, -half_depth, box_height)          # ボーンの根本：商品の上面の手前の辺
-# ボーンの先端を奥方向（Y軸の正方向）に伸ばす
-bone_front_top.tail = (0, -half_depth + (paper_corner_y + half_depth), box_height)
-bone_front_top.parent = bone_front_bottom  # bone_front_bottomの子にする
-
-# === 左側の面：垂直に立ち上げるボーン ===
-# 包装紙の左端の位置を計算（45度回転を考慮）
-paper_left_edge = -paper_size/2 + paper_offset_x
-
-# 左側の包装紙の距離を3分割して、段階的な織り込みを表現
-left_distance = abs(paper_left_edge + half_width)
-left_middle_point = -half_width - (left_distance / 2)  # 中間地点（45度の位置）
-
-# 1. 基本の左側ボーン（商品の角から中間地点まで）
-bone_left_side = armature.data.edit_bones.new("FoldBone_Left_Side")
-bone_left_side.head = (-half_width, -half_depth, 0)  # ボーンの根本：商品の手前左下の角（底面）
-bone_left_side.tail = (left_middle_point, -half_depth, 0)  # ボーンの先端：中間地点
-
-# 2. 中間ボーン（45度の位置、内側に織り込む動作用）
-bone_left_middle = armature.data.edit_bones.new("FoldBone_Left_Middle")
-bone_left_middle.head = (left_middle_point, -half_depth, 0)  # ボーンの根本：中間地点
-bone_left_middle.tail = (paper_left_edge, -half_depth, 0)  # ボーンの先端：左側の包装紙の端
-bone_left_middle.parent = bone_left_side  # bone_left_sideの子にする
-
-# === 手前側面の三角形織り込み用ボーン ===
-# 左側の包装紙が垂直に立ち上がった時、手前側面に飛び出る三角形部分を内側（谷折り）に折り込むためのボーン
-# 浮いている包装紙を折り曲げるため、ボーンは左方向（X軸負方向）に伸ばす
-# 商品の高さの半分の位置に配置
-bone_left_front_triangle = armature.data.edit_bones.new("FoldBone_Left_Front_Triangle")
-bone_left_front_triangle.head = (-half_width, -half_depth, box_height / 2)  # ボーンの根本：商品の高さの半分
-# 左方向（X軸負方向）に伸ばす
-triangle_extent = left_distance / 2  # 三角形の範囲
-bone_left_front_triangle.tail = (-half_width - triangle_extent, -half_depth, box_height / 2)  # 左方向に伸ばす（高さの半分）
-bone_left_front_triangle.parent = bone_left_side  # bone_left_sideの子にする
-
-# === 左側の包装紙を上面に折り返すボーン ===
-# 左側の包装紙を垂直に立ち上げた後、商品の上面に向かって折り返すためのボーン
-bone_left_top = armature.data.edit_bones.new("FoldBone_Left_Top")
-bone_left_top.head = (-half_width, -half_depth, box_height)  # ボーンの根本：商品の手前左上の角（上面）
-# 商品の上面に沿って右方向（X軸正方向）に伸ばす
-bone_left_top.tail = (0, -half_depth, box_height)  # 商品の上面の中心まで
-bone_left_top.parent = bone_left_side  # bone_left_sideの子にする
-
-bpy.ops.object.mode_set(mode='OBJECT')
+stage_timer.begin("armature")
+# 骨格のハッシュはボーンの構成だけから作る（包装紙の解像度だけを変えた時は作り直さない）
+armature_hash = build_hash("armature", fold_bones(wrap_params))
+armature = current_object("WrappingArmature", armature_hash)
+armature_built = armature is None
+if armature_built:
+    bpy.ops.object.armature_add(enter_editmode=True, location=(0, 0, 0))
+    armature = bpy.context.active_object
+    armature.name = "WrappingArmature"
+
+    # 最初のボーンを削除
+    bpy.ops.armature.select_all(action='SELECT')
+    bpy.ops.armature.delete()
+
+    # 商品の辺と包装紙の角の位置からボーンを作成（ボーンの構成は wrap_rig.fold_spec を参照）
+    edit_bones = {}
+    for fold_bone in fold_bones(wrap_params):
+        edit_bone = armature.data.edit_bones.new(fold_bone.name)
+        edit_bone.head = fold_bone.head
+        edit_bone.tail = fold_bone.tail
+        if fold_bone.parent is not None:
+            edit_bone.parent = edit_bones[fold_bone.parent]
+        edit_bones[fold_bone.name] = edit_bone
+
+    bpy.ops.object.mode_set(mode='OBJECT')
+    armature[BUILD_HASH_KEY] = armature_hash
+stage_timer.count(bones=len(armature.data.bones))
 
 # 2. 包装紙に頂点グループを手動で設定
-bpy.ops.object.select_all(action='DESELECT')
-paper.select_set(True)
-bpy.context.view_layer.objects.active = paper
-
-# 頂点グループを作成
-vertex_group_front_bottom = paper.vertex_groups.new(name="FoldBone_Front_Bottom")
-vertex_group_front_top = paper.vertex_groups.new(name="FoldBone_Front_Top")
-vertex_group_left_side = paper.vertex_groups.new(name="FoldBone_Left_Side")
-vertex_group_left_middle = paper.vertex_groups.new(name="FoldBone_Left_Middle")
-vertex_group_left_front_triangle = paper.vertex_groups.new(name="FoldBone_Left_Front_Triangle")
-vertex_group_left_top = paper.vertex_groups.new(name="FoldBone_Left_Top")
-
-# 包装紙の頂点にウェイトを設定
-for v in paper.data.vertices:
-    # ワールド座標を取得（45度回転を考慮）
-    world_co = paper.matrix_world @ v.co
-
-    # 商品の底面の範囲を定義
-    inside_box = (abs(world_co.x) <= half_width and abs(world_co.y) <= half_depth)
-
-    # 底面の包装紙は動かさない（すべてのボーンの影響をゼロに）
-    if inside_box:
-        vertex_group_front_bottom.add([v.index], 0.0, 'REPLACE')
-        vertex_group_front_top.add([v.index], 0.0, 'REPLACE')
-        vertex_group_left_side.add([v.index], 0.0, 'REPLACE')
-        vertex_group_left_middle.add([v.index], 0.0, 'REPLACE')
-        vertex_group_left_front_triangle.add([v.index], 0.0, 'REPLACE')
-        vertex_group_left_top.add([v.index], 0.0, 'REPLACE')
-        continue
-
-    # === 手前の面：折り目より手前側（Y < -half_depth）の頂点にウェイトを設定 ===
-    # ただし、左側の領域（X < -half_width）は除外（左側の包装紙として別途処理）
-    if world_co.y < -half_depth and world_co.x >= -half_width:
-        # 底面の折り目からの距離
-        distance_from_bottom = abs(world_co.y + half_depth)
-
-        # 立ち上がった後の上面の折り目の位置（底面から box_height の距離）
-        # 上面の折り目より手前側は FoldBone_Front_Top に、それ以外は FoldBone_Front_Bottom に
-        if distance_from_bottom > box_height:
-            # 上面より先の部分：FoldBone_Front_Topの影響を主に受ける
-            # 上面の折り目からの距離を計算
-            distance_from_top_fold = distance_from_bottom - box_height
-            max_distance = abs(paper_corner_y + half_depth) - box_height
-
-            # 折り目に近い部分はBottomの影響も少し受けるが、先端に行くほど受けない
-            # Bottomウェイト: 折り目=1.0 → 先端=0.0
-            weight_bottom = max(0.0, 1.0 - (distance_from_top_fold / max_distance))
-            vertex_group_front_bottom.add([v.index], weight_bottom, 'REPLACE')
-
-            # Topウェイト: 常に1.0（上面の折り曲げを確実に反映）
-            vertex_group_front_top.add([v.index], 1.0, 'REPLACE')
-
-            # 手前の包装紙は左側ボーンの影響を受けない（曲がりを防ぐ）
-            vertex_group_left_side.add([v.index], 0.0, 'REPLACE')
-            vertex_group_left_middle.add([v.index], 0.0, 'REPLACE')
-            vertex_group_left_front_triangle.add([v.index], 0.0, 'REPLACE')
-            vertex_group_left_top.add([v.index], 0.0, 'REPLACE')
-        else:
-            # 底面から上面までの部分：FoldBone_Front_Bottom のみ
-            weight = min(1.0, distance_from_bottom / 0.5)
-            vertex_group_front_bottom.add([v.index], weight, 'REPLACE')
-            # FoldBone_Front_Top の影響は受けない（ウェイト0）
-            vertex_group_front_top.add([v.index], 0.0, 'REPLACE')
-
-            # 手前の包装紙は左側ボーンの影響を受けない（曲がりを防ぐ）
-            vertex_group_left_side.add([v.index], 0.0, 'REPLACE')
-            vertex_group_left_middle.add([v.index], 0.0, 'REPLACE')
-            vertex_group_left_front_triangle.add([v.index], 0.0, 'REPLACE')
-            vertex_group_left_top.add([v.index], 0.0, 'REPLACE')
-
-    # === 左側の面：手前の底辺より左側の頂点（包装紙の左下の角の領域） ===
-    # 包装紙が45度回転しているので、対角線で判定
-    # 手前の折り目（Y = -half_depth）より手前で、かつ左側にある領域
-    elif world_co.x < -half_width:
-        # 手前の底辺の折り目からの距離（X方向）
-        distance_from_left = abs(world_co.x + half_width)
-
-        # 手前からの距離（Y方向）
-        distance_from_front = abs(world_co.y + half_depth)
-
-        # グラデーションウェイト（折り目に近いほど強く）
-        base_weight = min(1.0, distance_from_left / 0.5)
-
-        # 左側の包装紙を2つのボーンで制御（中間地点で分ける）
-        # 商品の角から中間地点まで：Left_Side
-        # 中間地点から包装紙の端まで：Left_Middle
-        distance_ratio = distance_from_left / left_distance if left_distance > 0.01 else 0
-
-        if distance_ratio < 0.5:
-            # 商品に近い側：Left_Sideのみの影響
-            vertex_group_left_side.add([v.index], base_weight, 'REPLACE')
-            vertex_group_left_middle.add([v.index], 0.0, 'REPLACE')
-        else:
-            # 中間地点より外側：両方のボーンの影響を受ける
-            # Left_Sideは常に影響を受ける（親ボーン）
-            vertex_group_left_side.add([v.index], base_weight, 'REPLACE')
-            # Left_Middleは中間地点から先で影響が強くなる
-            middle_influence = (distance_ratio - 0.5) * 2.0  # 0.5〜1.0 を 0.0〜1.0 にマッピング
-            vertex_group_left_middle.add([v.index], middle_influence * base_weight, 'REPLACE')
-
-        # 手前側面の三角形織り込み領域の判定
-        # FoldBone_Left_Front_Triangleが接している包装紙の部分のみを動かす
-        #
-        # 重要：FoldBone_Left_Front_Triangleはbone_left_sideの子ボーン
-        # bone_left_sideが90度回転した後に、FoldBone_Left_Front_Triangleと接触する包装紙を判定
-        #
-        # bone_left_sideの回転：
-        # - 回転軸：(-half_width, -half_depth, 0) から X軸負方向に伸びる（Z軸は0のまま）
-        # - 回転：X軸で90度回転（平面上の包装紙を垂直に立ち上げる）
-        #
-        # 立ち上がり前後の座標変換：
-        # - 回転軸はY=-half_depthの位置
-        # - 平面上でY=-half_depthからY軸正方向（奥）に距離dだけ離れた点は、
-        #   立ち上がった後、Y=-half_depthの位置でZ=dの高さに移動する
-        #
-        # FoldBone_Left_Front_Triangleの位置：
-        # - 立ち上がった後：(-half_width, -half_depth, box_height/2) から左方向に伸びる
-        # - したがって、ボーンと接触する包装紙は、
-        #   平面上でY=-half_depthからY軸正方向にbox_height/2離れた位置の包装紙
-        #
-        # 判定条件（平面上の座標）：
-        # - X座標：-half_widthより左側（X < -half_width）
-        # - Y座標：-half_depth から -half_depth + box_height/2 の範囲
-
-        # Y座標の判定：回転軸から手前方向（-Y方向）にbox_height/2の範囲
-        # bone_left_sideの回転軸はX軸負方向に伸びる（Y=-half_depth, Z=0の位置）
-        # X軸まわりに90度回転すると：
-        #   - Y軸正方向（奥）にある点 → Z軸負方向（下）に移動
-        #   - Z軸正方向（上）にある点 → Y軸正方向（奥）に移動
-        #
-        # したがって、立ち上がった後にZ=box_height/2の高さにある点は、
-        # 立ち上がる前（平面上）でY=-half_depth - box_height/2の位置にあった
-        #
-        # つまり、回転軸から-Y方向（手前方向）にbox_height/2離れた位置
-
-        y_bone_contact_center = -half_depth - box_height / 2  # ボーンの中心位置（立ち上がり前、手前方向）
-        y_tolerance = 0.5  # 影響範囲の許容値
-
-        # ボーンが接触する包装紙のY座標範囲
-        y_min = y_bone_contact_center - y_tolerance
-        y_max = y_bone_contact_center + y_tolerance
-        is_at_bone_contact_y = (y_min <= world_co.y <= y_max)
-
-        # ボーンが接している包装紙の判定
-        if is_at_bone_contact_y:
-            # Y方向の位置に応じた影響の強さ
-            # ボーンの中心位置に近いほど強い影響
-            y_distance_from_center = abs(world_co.y - y_bone_contact_center)
-            y_influence = 1.0 - (y_distance_from_center / y_tolerance)
-            y_influence = max(0.0, min(1.0, y_influence))
-
-            # X方向の影響（商品の左辺から左に行くほど弱くなる）
-            x_influence = 1.0
-            if distance_from_left > 0:
-                # 左に行くほど影響が弱くなる（box_heightの範囲で減衰）
-                x_influence = max(0.0, 1.0 - distance_from_left / box_height)
-
-            # 接触強度
-            contact_strength = y_influence * x_influence
-            vertex_group_left_front_triangle.add([v.index], contact_strength, 'REPLACE')
-        else:
-            vertex_group_left_front_triangle.add([v.index], 0.0, 'REPLACE')
-
-        # 上面に折り返す部分のウェイト（商品の上面の高さより上の部分）
-        # 立ち上がった後、上面に向かって折り返す
-        # 左側の包装紙全体が上面折り返しの影響を受ける
-        vertex_group_left_top.add([v.index], base_weight, 'REPLACE')
-
-        # 手前のボーンの影響は受けない
-        vertex_group_front_bottom.add([v.index], 0.0, 'REPLACE')
-        vertex_group_front_top.add([v.index], 0.0, 'REPLACE')
-
-    # === その他の領域：どのボーンにも該当しない頂点 ===
+# 包装紙をそのまま使う場合は、前回設定した頂点グループとウェイトもそのまま使う
+# 全頂点の座標を foreach_get でまとめて取得し、1回の行列積でワールド座標に変換してから計算する
+def compute_paper_weights():
+    paper_co = np.empty(len(paper.data.vertices) * 3, dtype=np.float32)
+    paper.data.vertices.foreach_get("co", paper_co)
+    world_co = to_world(paper_co.reshape(-1, 3), np.array(paper.matrix_world))
+    return compute_fold_weights(world_co, wrap_params)
+
+
+weight_cache = WeightCache(os.path.join(script_dir, "weight_cache"))
+fold_weights = None
+if paper_built:
+    stage_timer.begin("weights")
+    bpy.ops.object.select_all(action='DESELECT')
+    paper.select_set(True)
+    bpy.context.view_layer.objects.active = paper
+
+    # 頂点グループを作成（ボーンと同じ名前）
+    vertex_groups = [paper.vertex_groups.new(name=name) for name in BONE_NAMES]
+
+    # 形状のパラメータが同じなら、前回計算したウェイトをキャッシュから読み込む
+    # （ベンチマークなどでは WRAP_JOB の "weight_cache": False で毎回計算する）
+    if wrap_job.get("weight_cache", True):
+        fold_weights = weight_cache.get_or_compute(
+            wrap_params, compute_paper_weights, vertex_count=len(paper.data.vertices)
+        )
     else:
-        # どのボーンの影響も受けない（ウェイト0）
-        vertex_group_front_bottom.add([v.index], 0.0, 'REPLACE')
-        vertex_group_front_top.add([v.index], 0.0, 'REPLACE')
-        vertex_group_left_side.add([v.index], 0.0, 'REPLACE')
-        vertex_group_left_middle.add([v.index], 0.0, 'REPLACE')
-        vertex_group_left_front_triangle.add([v.index], 0.0, 'REPLACE')
-        vertex_group_left_top.add([v.index], 0.0, 'REPLACE')
+        fold_weights = compute_paper_weights()
+    stage_timer.count(weight_cache_hits=weight_cache.hits)
+
+    # 同じウェイトの頂点をまとめて登録し、ウェイト0の頂点は頂点グループに登録しない
+    stage_timer.begin("vertex_groups")
+    vertex_group_add_calls = assign_vertex_groups(vertex_groups, fold_weights)
+    stage_timer.count(
+        vertex_groups=len(vertex_groups),
+        memberships=membership_count(fold_weights),
+        vertex_group_add_calls=vertex_group_add_calls,
+    )
+    if paper_hash is not None:
+        paper[BUILD_HASH_KEY] = paper_hash
+else:
+    vertex_groups = [paper.vertex_groups[name] for name in BONE_NAMES]
 
 # 3. 包装紙をアーマチュアの子にする（Armature Deform with Empty Groups）
-paper.select_set(True)
-armature.select_set(True)
-bpy.context.view_layer.objects.active = armature
-bpy.ops.object.parent_set(type='ARMATURE')
-
-# アーマチュアモディファイアの設定を確認・調整
-for modifier in paper.modifiers:
-    if modifier.type == 'ARMATURE':
-        modifier.use_vertex_groups = True
-        modifier.use_deform_preserve_volume = False
+# 包装紙と骨格のどちらかを作り直した時だけ設定し直す
+if paper_built or armature_built:
+    stage_timer.begin("parent_set")
+    # 削除した骨格を指していた古いアーマチュアモディファイアを外す
+    for modifier in list(paper.modifiers):
+        if modifier.type == 'ARMATURE':
+            paper.modifiers.remove(modifier)
+    bpy.ops.object.select_all(action='DESELECT')
+    paper.select_set(True)
+    armature.select_set(True)
+    bpy.context.view_layer.objects.active = armature
+    bpy.ops.object.parent_set(type='ARMATURE')
+
+    # アーマチュアモディファイアの設定を確認・調整
+    for modifier in paper.modifiers:
+        if modifier.type == 'ARMATURE':
+            modifier.use_vertex_groups = True
+            modifier.use_deform_preserve_volume = False
+
+# 4. 表示用の軽い包装紙（LOD）を作る（PAPER_LODS が空でない時のみ）
+# ウェイトは基準のグリッドで1回だけ計算し（ウェイトキャッシュを使う）、各 LOD の頂点に移す
+# LOD も同じ骨格で動かす。元の包装紙は "Paper_Render"、LOD は "Paper_<名前>" コレクションに入れ、
+# 最初のビューレイヤー（レンダリング用）では元の包装紙だけ、"Paper_<名前>" のビューレイヤーでは
+# その LOD だけを含める（表示するビューレイヤーを切り替えるだけで軽い包装紙で再生できる）
+# LOD のビューレイヤーはレンダリングには使わない（use = False）
+def paper_collection(name, obj):
+    # 包装紙用のコレクションを用意し、obj をそのコレクションだけに入れる
+    scene = bpy.context.scene
+    collection = bpy.data.collections.get(name) or bpy.data.collections.new(name)
+    if scene.collection.children.get(collection.name) is None:
+        scene.collection.children.link(collection)
+    if collection.objects.get(obj.name) is None:
+        collection.objects.link(obj)
+    for other in list(obj.users_collection):
+        if other != collection:
+            other.objects.unlink(obj)
+    return collection
+
+
+if PAPER_LODS:
+    stage_timer.begin("paper_lods")
+    lod_reference_params = reference_params(wrap_params)
+    lod_reference_weights = None
+    lod_collections = []
+    lod_vertex_count = 0
+    for lod_name, lod_cuts in PAPER_LODS.items():
+        lod_object_name = f"WrappingPaper_{lod_name}"
+        lod_hash = build_hash(
+            "paper_lod",
+            asdict(wrap_params),
+            lod_cuts,
+            LOD_TRANSFER,
+            TRANSFER_VERSION,
+            mesh_layout_key(lod_params(wrap_params, lod_cuts)),
+        )
+        lod = current_object(lod_object_name, lod_hash)
+        if lod is None:
+            if lod_reference_weights is None:
+                if wrap_job.get("weight_cache", True):
+                    lod_reference_weights = weight_cache.get_or_compute(
+                        lod_reference_params,
+                        partial(reference_weights, lod_reference_params),
+                        vertex_count=(lod_reference_params.number_cuts + 2) ** 2,
+                    )
+                else:
+                    lod_reference_weights = reference_weights(lod_reference_params)
+
+            lod_vertices, lod_faces = paper_mesh_arrays(lod_params(wrap_params, lod_cuts))
+            lod_mesh = build_mesh(bpy.data.meshes.new(lod_object_name), lod_vertices, lod_faces)
+            lod = bpy.data.objects.new(lod_object_name, lod_mesh)
+            bpy.context.scene.collection.objects.link(lod)
+            lod.location = (paper_offset_x, paper_offset_y, 0)
+            lod.rotation_euler[2] = math.radians(45)
+            lod.hide_render = True
+            lod_vertex_groups = [lod.vertex_groups.new(name=name) for name in BONE_NAMES]
+            assign_vertex_groups(
+                lod_vertex_groups,
+                transfer_weights(lod_reference_weights, lod_reference_params, lod_vertices, LOD_TRANSFER),
+            )
+            lod[BUILD_HASH_KEY] = lod_hash
+
+        # 骨格を作り直した時は付け直す
+        if lod.parent != armature:
+            for modifier in list(lod.modifiers):
+                if modifier.type == 'ARMATURE':
+                    lod.modifiers.remove(modifier)
+            lod.parent = armature
+            lod.matrix_parent_inverse = armature.matrix_world.inverted()
+            modifier = lod.modifiers.new(name="Armature", type='ARMATURE')
+            modifier.object = armature
+            modifier.use_vertex_groups = True
+            modifier.use_deform_preserve_volume = False
+        lod_collections.append((lod_name, paper_collection(f"Paper_{lod_name}", lod)))
+        lod_vertex_count += len(lod.data.vertices)
+
+    # ビューレイヤーごとに、使う包装紙のコレクションだけを含める
+    scene = bpy.context.scene
+    render_collection = paper_collection("Paper_Render", paper)
+    layer_collections = [(scene.view_layers[0], render_collection)]
+    for lod_name, collection in lod_collections:
+        layer_name = f"Paper_{lod_name}"
+        view_layer = scene.view_layers.get(layer_name) or scene.view_layers.new(layer_name)
+        # LOD のビューレイヤーは表示用なので、レンダリング（F12、render_frames.py）では使わない
+        view_layer.use = False
+        layer_collections.append((view_layer, collection))
+    paper_collections = [render_collection] + [collection for _, collection in lod_collections]
+    for view_layer, used_collection in layer_collections:
+        for collection in paper_collections:
+            view_layer.layer_collection.children[collection.name].exclude = collection != used_collection
+    stage_timer.count(lods=len(lod_collections), lod_vertices=lod_vertex_count)
+
+# PAPER_LODS から外した LOD のビューレイヤーとコレクションを削除する
+# （LOD のオブジェクトは SCENE_OBJECTS に含まれないので、初期設定で削除済み）
+lod_layer_names = {f"Paper_{lod_name}" for lod_name in PAPER_LODS}
+for view_layer in list(bpy.context.scene.view_layers):
+    if (
+        view_layer.name.startswith("Paper_")
+        and view_layer.name not in lod_layer_names
+        and len(bpy.context.scene.view_layers) > 1
+    ):
+        bpy.context.scene.view_layers.remove(view_layer)
+for collection in list(bpy.data.collections):
+    if (
+        collection.name.startswith("Paper_")
+        and collection.name != "Paper_Render"
+        and collection.name not in lod_layer_names
+    ):
+        bpy.data.collections.remove(collection)
 
 
 # --- ステップ3：アニメーションの設定（斜め包み） ---
 
 # アニメーションのフレーム範囲を設定
+stage_timer.begin("keyframes")
 bpy.context.scene.frame_start = 1
 bpy.context.scene.frame_end = 190
 
-# アーマチュアを選択してポーズモードに切り替え
-bpy.ops.object.select_all(action='DESELECT')
-armature.select_set(True)
-bpy.context.view_layer.objects.active = armature
-bpy.ops.object.mode_set(mode='POSE')
-
-# ボーンを取得
-pbone_front_bottom = armature.pose.bones["FoldBone_Front_Bottom"]
-pbone_front_top = armature.pose.bones["FoldBone_Front_Top"]
-pbone_left_side = armature.pose.bones["FoldBone_Left_Side"]
-pbone_left_middle = armature.pose.bones["FoldBone_Left_Middle"]
-pbone_left_front_triangle = armature.pose.bones["FoldBone_Left_Front_Triangle"]
-pbone_left_top = armature.pose.bones["FoldBone_Left_Top"]
-
-pbone_front_bottom.rotation_mode = 'XYZ'
-pbone_front_top.rotation_mode = 'XYZ'
-pbone_left_side.rotation_mode = 'XYZ'
-pbone_left_middle.rotation_mode = 'XYZ'
-pbone_left_front_triangle.rotation_mode = 'XYZ'
-pbone_left_top.rotation_mode = 'XYZ'
-
-# フレーム1: 初期位置（平らな状態）
-bpy.context.scene.frame_set(1)
-pbone_front_bottom.rotation_euler = (0, 0, 0)
-pbone_front_top.rotation_euler = (0, 0, 0)
-pbone_left_side.rotation_euler = (0, 0, 0)
-pbone_left_middle.rotation_euler = (0, 0, 0)
-pbone_left_front_triangle.rotation_euler = (0, 0, 0)
-pbone_left_top.rotation_euler = (0, 0, 0)
-pbone_front_bottom.keyframe_insert(data_path="rotation_euler", frame=1)
-pbone_front_top.keyframe_insert(data_path="rotation_euler", frame=1)
-pbone_left_side.keyframe_insert(data_path="rotation_euler", frame=1)
-pbone_left_middle.keyframe_insert(data_path="rotation_euler", frame=1)
-pbone_left_front_triangle.keyframe_insert(data_path="rotation_euler", frame=1)
-pbone_left_top.keyframe_insert(data_path="rotation_euler", frame=1)
-
-# === 工程1：手前の紙を立ち上げて上面にかぶせる（フレーム1-90） ===
-# 左側のボーンは最初は動かない
-bpy.context.scene.frame_set(90)
-pbone_left_side.rotation_euler = (0, 0, 0)
-pbone_left_middle.rotation_euler = (0, 0, 0)
-pbone_left_front_triangle.rotation_euler = (0, 0, 0)
-pbone_left_top.rotation_euler = (0, 0, 0)
-pbone_left_side.keyframe_insert(data_path="rotation_euler", frame=90)
-pbone_left_middle.keyframe_insert(data_path="rotation_euler", frame=90)
-pbone_left_front_triangle.keyframe_insert(data_path="rotation_euler", frame=90)
-pbone_left_top.keyframe_insert(data_path="rotation_euler", frame=90)
-
-# フレーム60: 第1段階 - 90度上空に立ち上げる（商品の手前の面に沿って垂直にする）
-bpy.context.scene.frame_set(60)
-pbone_front_bottom.rotation_euler[0] = math.radians(-90)  # X軸で-90度回転（上方向に立ち上げる）
-pbone_front_top.rotation_euler = (0, 0, 0)  # まだ折らない
-pbone_front_bottom.keyframe_insert(data_path="rotation_euler", frame=60)
-pbone_front_top.keyframe_insert(data_path="rotation_euler", frame=60)
-
-# フレーム90: 第2段階 - 商品の上面の高さで90度折り曲げて覆いかぶせる
-bpy.context.scene.frame_set(90)
-pbone_front_bottom.rotation_euler[0] = math.radians(-90)  # 第1段階の状態を維持
-# bone2はbone1の子なので、bone1の-90度回転に対して、さらに+90度回転して合計0度にする
-# これにより、包装紙が水平になる（商品の上面に平行）
-pbone_front_top.rotation_euler[0] = math.radians(90)      # 上面で+90度折り曲げる（合計0度で水平）
-pbone_front_top.rotation_euler[1] = 0  # Y軸回転なし
-pbone_front_top.rotation_euler[2] = 0  # Z軸回転なし
-pbone_front_bottom.keyframe_insert(data_path="rotation_euler", frame=90)
-pbone_front_top.keyframe_insert(data_path="rotation_euler", frame=90)
-
-# === 工程2：左側の紙を商品の左側面に沿わせて折ってから立ち上げる ===
-# ステップ1: まず三角形を内側に織り込む（平らな状態で商品の左側面に沿わせる）
-# [00:40 - 00:44] 三角形の織り込み開始
-bpy.context.scene.frame_set(115)
-pbone_left_side.rotation_euler[0] = math.radians(0)  # まだ立ち上げない（平らなまま）
-pbone_left_middle.rotation_euler[0] = math.radians(0)  # まだ立ち上げない
-# 浮いている包装紙を上方向（Z軸で回転）に折り曲げ開始
-pbone_left_front_triangle.rotation_euler[2] = math.radians(45)  # Z軸で45度回転（上方向に折り曲げ開始）
-pbone_left_top.rotation_euler = (0, 0, 0)  # まだ折り返さない
-pbone_left_side.keyframe_insert(data_path="rotation_euler", frame=115)
-pbone_left_middle.keyframe_insert(data_path="rotation_euler", frame=115)
-pbone_left_front_triangle.keyframe_insert(data_path="rotation_euler", frame=115)
-pbone_left_top.keyframe_insert(data_path="rotation_euler", frame=115)
-
-# フレーム130: 三角形の織り込み完了（平らな状態で商品の左側面に沿う）
-bpy.context.scene.frame_set(130)
-pbone_left_side.rotation_euler[0] = math.radians(0)  # まだ立ち上げない
-pbone_left_middle.rotation_euler[0] = math.radians(0)  # まだ立ち上げない
-# 浮いている包装紙を完全に上方向に折り曲げる
-pbone_left_front_triangle.rotation_euler[2] = math.radians(90)  # Z軸で90度回転（完全に上方向に折り曲げる）
-pbone_left_top.rotation_euler = (0, 0, 0)  # まだ折り返さない
-pbone_left_side.keyframe_insert(data_path="rotation_euler", frame=130)
-pbone_left_middle.keyframe_insert(data_path="rotation_euler", frame=130)
-pbone_left_front_triangle.keyframe_insert(data_path="rotation_euler", frame=130)
-pbone_left_top.keyframe_insert(data_path="rotation_euler", frame=130)
-
-# ステップ2: 左側面に沿わせた状態で垂直に立ち上げる
-# [00:45 - 00:51] 立ち上げ開始
-bpy.context.scene.frame_set(150)
-pbone_left_side.rotation_euler[0] = math.radians(60)  # 立ち上げ途中
-pbone_left_middle.rotation_euler[0] = math.radians(40)  # 中間部分も立ち上げ
-pbone_left_front_triangle.rotation_euler[2] = math.radians(90)  # Z軸で90度を維持（上方向に折り曲げた状態）
-pbone_left_top.rotation_euler = (0, 0, 0)  # まだ折り返さない
-pbone_left_side.keyframe_insert(data_path="rotation_euler", frame=150)
-pbone_left_middle.keyframe_insert(data_path="rotation_euler", frame=150)
-pbone_left_front_triangle.keyframe_insert(data_path="rotation_euler", frame=150)
-pbone_left_top.keyframe_insert(data_path="rotation_euler", frame=150)
-
-# フレーム165: 完全に垂直に立ち上げ完了
-bpy.context.scene.frame_set(165)
-pbone_left_side.rotation_euler[0] = math.radians(90)  # X軸で90度回転（完全に垂直）
-pbone_left_middle.rotation_euler[0] = math.radians(70)  # 中間部分もさらに立ち上げ（内側への織り込みを表現）
-pbone_left_front_triangle.rotation_euler[2] = math.radians(90)  # Z軸で90度を維持（上方向に折り曲げた状態）
-pbone_left_top.rotation_euler = (0, 0, 0)  # まだ折り返さない
-pbone_left_side.keyframe_insert(data_path="rotation_euler", frame=165)
-pbone_left_middle.keyframe_insert(data_path="rotation_euler", frame=165)
-pbone_left_front_triangle.keyframe_insert(data_path="rotation_euler", frame=165)
-pbone_left_top.keyframe_insert(data_path="rotation_euler", frame=165)
-
-# ステップ3: 商品の上面に折り返す
-# [00:52 - 00:56] 上面に折り返す
-bpy.context.scene.frame_set(190)
-pbone_left_side.rotation_euler[0] = math.radians(90)  # 90度を維持
-pbone_left_middle.rotation_euler[0] = math.radians(90)  # 中間部分も90度まで立ち上げる
-pbone_left_front_triangle.rotation_euler[2] = math.radians(90)  # Z軸で90度を維持（上方向に折り曲げた状態）
-# 上面に向かって折り返す（X軸で-90度回転）
-pbone_left_top.rotation_euler[0] = math.radians(-90)  # X軸で-90度回転（上面に折り返す）
-pbone_left_side.keyframe_insert(data_path="rotation_euler", frame=190)
-pbone_left_middle.keyframe_insert(data_path="rotation_euler", frame=190)
-pbone_left_front_triangle.keyframe_insert(data_path="rotation_euler", frame=190)
-pbone_left_top.keyframe_insert(data_path="rotation_euler", frame=190)
-
-# オブジェクトモードに戻る
-bpy.ops.object.mode_set(mode='OBJECT')
+# キーフレームの表が前回と同じで、骨格も作り直していなければアクションはそのまま使う
+TIMELINE_HASH_KEY = "wrap_timeline_hash"
+timeline_hash = build_hash("timeline", KEYFRAMES)
+if not INCREMENTAL_BUILD or armature.get(TIMELINE_HASH_KEY) != timeline_hash:
+    # ボーンの回転モードをそろえる
+    for pose_bone in armature.pose.bones:
+        pose_bone.rotation_mode = 'XYZ'
+        pose_bone.rotation_euler = (0, 0, 0)
+
+    # 前回のアクションを削除してから作る（名前が "WrappingArmatureAction.001" にならないように）
+    armature.animation_data_create()
+    armature.animation_data.action = None
+    remove_unused(bpy.data.actions, "WrappingArmatureAction")
+
+    # キーフレームの表（wrap_timeline.KEYFRAMES）からFカーブをまとめて作る
+    # frame_set() でフレームごとにシーンを評価し直さないので、包装紙の解像度に関係なく一定時間で終わる
+    armature.animation_data.action = bpy.data.actions.new("WrappingArmatureAction")
+    keyframe_count, fcurve_count = apply_timeline(armature.animation_data.action, KEYFRAMES, datablock=armature)
+    armature[TIMELINE_HASH_KEY] = timeline_hash
+    stage_timer.count(keyframes=keyframe_count, fcurves=fcurve_count)
+else:
+    stage_timer.count(reused=1)
+
+# 包装紙の変形を頂点キャッシュに焼き込む（BAKE_VERTEX_CACHE が True の時のみ）
+# 1フレームずつ評価してファイルに書き込むので、フレーム数や解像度が増えても使用メモリは増えない
+if BAKE_VERTEX_CACHE:
+    stage_timer.begin("bake")
+    scene = bpy.context.scene
+    bake_dir = os.path.join(script_dir, "bake")
+    cache_path = os.path.join(bake_dir, "WrappingPaper.vcache")
+    live_times = []
+
+    def evaluate_paper(frame):
+        evaluate_start = time.perf_counter()
+        scene.frame_set(frame)
+        paper_eval = paper.evaluated_get(bpy.context.evaluated_depsgraph_get())
+        mesh = paper_eval.to_mesh()
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+        paper_eval.to_mesh_clear()
+        live_times.append(time.perf_counter() - evaluate_start)
+        return co
+
+    bake(cache_path, scene.frame_start, scene.frame_end, evaluate_paper, len(paper.data.vertices))
+    pc2_path = export_pc2(cache_path, os.path.join(bake_dir, "WrappingPaper.pc2"))
+    scene.frame_set(scene.frame_start)
+    print(f"頂点キャッシュ: {os.path.getsize(cache_path) / 2 ** 20:.1f} MiB ({cache_path})")
+    print(
+        f"1フレームあたり: アーマチュアの評価 {sum(live_times) / len(live_times) * 1000:.2f} ms / "
+        f"キャッシュの読み込み {read_time_per_frame(cache_path) * 1000:.3f} ms"
+    )
+
+    if USE_BAKED_CACHE:
+        # アーマチュアモディファイアを外し、計算なしでキャッシュを再生する
+        for modifier in list(paper.modifiers):
+            if modifier.type == 'ARMATURE':
+                paper.modifiers.remove(modifier)
+        mesh_cache = paper.modifiers.new(name="WrappingPaperCache", type='MESH_CACHE')
+        mesh_cache.cache_format = 'PC2'
+        mesh_cache.filepath = pc2_path
+        mesh_cache.frame_start = scene.frame_start
 
 # カメラとライトを追加（見やすくするため）
-bpy.ops.object.camera_add(location=(10, -10, 8))
-camera = bpy.context.active_object
-camera.rotation_euler = (math.radians(60), 0, math.radians(45))
+stage_timer.begin("camera_light")
+camera_location = (10, -10, 8)
+camera_rotation = (math.radians(60), 0, math.radians(45))
+camera_hash = build_hash("camera", camera_location, camera_rotation)
+camera = current_object("Camera", camera_hash)
+if camera is None:
+    bpy.ops.object.camera_add(location=camera_location)
+    camera = bpy.context.active_object
+    camera.name = "Camera"
+    camera.rotation_euler = camera_rotation
+    camera[BUILD_HASH_KEY] = camera_hash
 bpy.context.scene.camera = camera
 
-bpy.ops.object.light_add(type='SUN', location=(5, 5, 10))
-
-print("斜め包みアニメーション（手前→上面、左側→垂直立ち上げ）の作成が完了しました。")
+light_location = (5, 5, 10)
+light_hash = build_hash("light", "SUN", light_location)
+light = current_object("Light", light_hash)
+if light is None:
+    bpy.ops.object.light_add(type='SUN', location=light_location)
+    light = bpy.context.active_object
+    light.name = "Light"
+    light[BUILD_HASH_KEY] = light_hash
+
+# 作り直して使われなくなったメッシュ、アーマチュア、アクション、マテリアルなどを削除する
+stage_timer.begin("purge_orphans")
+stage_timer.count(orphans=purge_orphans(bpy.data))
+stage_timer.end()
+
+# 頂点グループの登録数と変形の評価時間の比較（REPORT_VERTEX_GROUP_STATS が True の時のみ）
+def measure_frame_time(scene, frames):
+    # フレームを切り替えて、アーマチュア変形を含む依存グラフの評価時間を計る
+    start = time.perf_counter()
+    for frame in frames:
+        scene.frame_set(frame)
+    return (time.perf_counter() - start) / len(frames)
+
+
+if REPORT_VERTEX_GROUP_STATS:
+    if fold_weights is None:
+        fold_weights = compute_paper_weights()
+    scene = bpy.context.scene
+    sample_frames = range(scene.frame_start, scene.frame_end + 1)
+    sparse_members = membership_count(fold_weights)
+    sparse_time = measure_frame_time(scene, sample_frames)
+
+    # 比較用：以前と同じようにウェイト0の頂点も全て登録する
+    zero_indices = [np.flatnonzero(bone_weights <= 0.0).tolist() for bone_weights in fold_weights.T]
+    for vertex_group, indices in zip(vertex_groups, zero_indices):
+        vertex_group.add(indices, 0.0, 'REPLACE')
+    dense_members = len(paper.data.vertices) * len(vertex_groups)
+    dense_time = measure_frame_time(scene, sample_frames)
+
+    # 元に戻す（ウェイト0の登録を削除）
+    for vertex_group, indices in zip(vertex_groups, zero_indices):
+        vertex_group.remove(indices)
+    scene.frame_set(scene.frame_start)
+
+    print(f"頂点グループの登録数: {dense_members} → {sparse_members}")
+    print(f"1フレームあたりの評価時間: {dense_time * 1000:.2f} ms → {sparse_time * 1000:.2f} ms")
+
+print(weight_cache.summary())
+print(stage_timer.summary())
+stage_timer.write_json(wrap_job.get("report_path", os.path.join(script_dir, "reports", "stage_report.json")))
+print("斜め包みアニメーション（手前・奥→上面、左右→垂直立ち上げ）の作成が完了しました。")
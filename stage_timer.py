@@ -0,0 +1,96 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+# シーン作成の各ステップの時間と件数（頂点数、頂点グループ数、キーフレーム数、RNA呼び出し回数など）を記録する
+# scripting.py のように上から順に実行するスクリプトでは begin() で次のステップに切り替え、
+# 関数の中などでは with timer.stage(...) を使う
+# profile=True の時は、ステップごとに cProfile の結果を profile_dir に .prof で保存する
+# track_memory=True の時は、ステップごとの Python 側（NumPy を含む）のメモリ使用量のピークも記録する
+
+
+class StageTimer:
+
+    def __init__(self, profile=False, profile_dir="profiles", track_memory=False):
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.track_memory = track_memory
+        self.records = []
+        self._current = None
+        self._start = None
+        self._profiler = None
+        self._memory_start = 0
+
+    def begin(self, name):
+        # 前のステップを終えて、次のステップの計測を始める
+        self.end()
+        self._current = {"stage": name, "counts": {}}
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._start = time.perf_counter()
+
+    def end(self):
+        if self._current is None:
+            return
+        self._current["seconds"] = time.perf_counter() - self._start
+        if self.track_memory:
+            self._current["peak_bytes"] = tracemalloc.get_traced_memory()[1] - self._memory_start
+        if self._profiler is not None:
+            self._profiler.disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"{len(self.records):02d}_{self._current['stage']}.prof")
+            self._profiler.dump_stats(path)
+            self._current["profile"] = path
+            self._profiler = None
+        self._memory_start = 0
+        self.records.append(self._current)
+        self._current = None
+
+    @contextmanager
+    def stage(self, name):
+        self.begin(name)
+        try:
+            yield self
+        finally:
+            self.end()
+
+    def count(self, **counts):
+        # 今のステップ（終わっていれば直前のステップ）に件数を記録する
+        record = self._current if self._current is not None else self.records[-1]
+        record["counts"].update(counts)
+
+    def stage_seconds(self):
+        return {record["stage"]: record["seconds"] for record in self.records}
+
+    def report(self):
+        self.end()
+        return {
+            "total_seconds": sum(record["seconds"] for record in self.records),
+            "stages": self.records,
+        }
+
+    def write_json(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def summary(self):
+        report = self.report()
+        lines = [f"合計 {report['total_seconds'] * 1000:.1f} ms"]
+        for record in report["stages"]:
+            counts = ", ".join(f"{key}={value}" for key, value in record["counts"].items())
+            lines.append(f"  {record['stage']}: {record['seconds'] * 1000:.1f} ms" + (f" ({counts})" if counts else ""))
+        return "\n".join(lines)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from compact_rig import MIN_TOTAL_WEIGHT, NO_BONE, open_rig, rig_faces, rig_weights, write_rig
+from paper_mesh import paper_mesh_arrays
+from wrap_params import WrapParams
+from wrap_rig import fold_bones
+from wrap_weights import compute_fold_weights, paper_matrix_world, to_world
+
+
+PARAMS = WrapParams(number_cuts=10)
+
+
+def small_rig(tmp_path, weight_format):
+    vertices, faces = paper_mesh_arrays(PARAMS)
+    rest_co = to_world(vertices, paper_matrix_world(PARAMS))
+    weights = compute_fold_weights(rest_co, PARAMS)
+    path = str(tmp_path / "paper.wrig")
+    write_rig(path, PARAMS, rest_co, faces, weights, fold_bones(PARAMS), weight_format)
+    return path, rest_co, faces, weights
+
+
+@pytest.mark.parametrize("weight_format, tolerance", [("uint8", 1 / 255), ("float16", 1e-3)])
+def test_round_trip(tmp_path, weight_format, tolerance):
+    # 保存したリグをメモリマップで開くと、レスト位置・面・ボーンは同じで、
+    # ウェイトは頂点ごとに合計1に正規化したものと量子化の誤差の範囲で一致する
+    path, rest_co, faces, weights = small_rig(tmp_path, weight_format)
+    rig = open_rig(path)
+    assert isinstance(rig.rest_co, np.memmap)
+    assert rig.params == PARAMS
+    assert rig.bones == fold_bones(PARAMS)
+    np.testing.assert_array_equal(rig.rest_co, rest_co.astype(np.float32))
+    np.testing.assert_array_equal(rig_faces(rig), faces)
+
+    total = weights.sum(axis=1, keepdims=True)
+    normalized = np.where(total > MIN_TOTAL_WEIGHT, weights / np.where(total > 0.0, total, 1.0), 0.0)
+    # K 本より多くのボーンを持つ頂点は切り捨てたボーンの分だけ違うので比べない
+    kept = np.count_nonzero(weights > 0.0, axis=1) <= rig.influence_bones.shape[1]
+    assert kept.any()
+    np.testing.assert_allclose(rig_weights(rig)[kept], normalized[kept], rtol=0, atol=tolerance)
+    # 一時ファイルは残らない
+    assert [entry.name for entry in tmp_path.iterdir()] == ["paper.wrig"]
+
+
+def test_uint8_weights_sum_to_255(tmp_path):
+    # uint8 のウェイトは、動く頂点ではちょうど255、動かない頂点では0になる
+    path, _, _, weights = small_rig(tmp_path, "uint8")
+    rig = open_rig(path)
+    sums = rig.influence_weights.astype(np.int64).sum(axis=1)
+    moving = weights.sum(axis=1) > MIN_TOTAL_WEIGHT
+    assert moving.any() and (~moving).any()
+    np.testing.assert_array_equal(sums[moving], 255)
+    np.testing.assert_array_equal(sums[~moving], 0)
+    assert np.all(rig.influence_bones[~moving] == NO_BONE)
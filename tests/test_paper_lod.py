@@ -0,0 +1,51 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+from paper_lod import lod_params, reference_params, reference_weights, transfer_weights
+from paper_mesh import paper_mesh_arrays
+from wrap_params import WrapParams
+from wrap_rig import fold_bones
+from wrap_skinning import evaluate_frames
+from wrap_weights import compute_fold_weights, paper_matrix_world, to_world
+
+# scripting.py の既定の LOD（"Viewport": 20）
+LOD_CUTS = 20
+
+
+def lod_weights(params, method):
+    # 基準のグリッドから移したウェイトと、LOD の頂点で直接計算したウェイト
+    reference = reference_params(params)
+    target = lod_params(params, LOD_CUTS)
+    vertices, _ = paper_mesh_arrays(target)
+    world_co = to_world(vertices, paper_matrix_world(target))
+    transferred = transfer_weights(reference_weights(reference), reference, vertices, method)
+    return world_co, transferred, compute_fold_weights(world_co, target)
+
+
+@pytest.mark.parametrize("method, tolerance", [("barycentric", 0.2), ("nearest", 0.3)])
+def test_lod_deforms_like_direct_weights(method, tolerance):
+    # 移したウェイトで変形した LOD は、直接計算したウェイトで変形した LOD とほぼ同じ位置になる
+    # （領域の境目をまたいで補間すると、側面の角で 6 以上ずれる）
+    params = WrapParams()
+    world_co, transferred, exact = lod_weights(params, method)
+    bones = fold_bones(params)
+    frames = np.arange(1, 191)
+    error = np.linalg.norm(
+        evaluate_frames(world_co, transferred, bones, frames) - evaluate_frames(world_co, exact, bones, frames), axis=2,
+    )
+    assert error.max() < tolerance
+
+
+@pytest.mark.parametrize("tessellation", ["uniform", "adaptive"])
+@pytest.mark.parametrize("method", ["barycentric", "nearest"])
+def test_bottom_face_stays(tessellation, method):
+    # 箱の底面（辺の上も含む）の頂点には、隣の側面のウェイトが混ざらない
+    params = dataclasses.replace(WrapParams(), tessellation=tessellation)
+    world_co, transferred, _ = lod_weights(params, method)
+    is_on_bottom = (np.abs(world_co[:, 0]) <= params.half_width + 1e-9) & (
+        np.abs(world_co[:, 1]) <= params.half_depth + 1e-9
+    )
+    assert is_on_bottom.any()
+    np.testing.assert_array_equal(transferred[is_on_bottom], 0.0)
@@ -0,0 +1,47 @@
+import json
+import os
+
+from render_frames import LOG_NAME, frame_path, render_frames
+
+
+def log_lines(out_dir):
+    with open(os.path.join(out_dir, LOG_NAME), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_resume_renders_only_missing_frame(tmp_path):
+    # 同じ範囲をもう一度実行すると、出力のないフレームだけをレンダリングして、ログに1行だけ追記する
+    out_dir = str(tmp_path)
+    records, skipped, _ = render_frames(out_dir, 1, 6, renderer="stub", workers=2, shard_size=2)
+    assert [record["frame"] for record in records] == [1, 2, 3, 4, 5, 6]
+    assert all(record["ok"] for record in records)
+    assert skipped == 0
+    assert len(log_lines(out_dir)) == 6
+
+    # フレーム4の書き込み中に止まった状態（出力がなく、書きかけの .part が残っている）
+    missing = frame_path(out_dir, 4)
+    os.remove(missing)
+    with open(missing + ".part", "wb") as f:
+        f.write(b"partial")
+    kept_mtime = os.path.getmtime(frame_path(out_dir, 3))
+
+    records, skipped, _ = render_frames(out_dir, 1, 6, renderer="stub", workers=2, shard_size=2)
+    assert [(record["frame"], record["ok"]) for record in records] == [(4, True)]
+    assert skipped == 5
+    assert os.path.getsize(missing) > 0
+    assert not os.path.exists(missing + ".part")
+    # 出力済みのフレームは書き直さない
+    assert os.path.getmtime(frame_path(out_dir, 3)) == kept_mtime
+    lines = log_lines(out_dir)
+    assert len(lines) == 7
+    assert lines[-1]["frame"] == 4
+
+
+def test_empty_output_is_rendered_again(tmp_path):
+    # 空のファイル（書き出しに失敗したもの）は出力済みとみなさない
+    out_dir = str(tmp_path)
+    render_frames(out_dir, 1, 2, renderer="stub", workers=1)
+    open(frame_path(out_dir, 2), "wb").close()
+    records, skipped, _ = render_frames(out_dir, 1, 2, renderer="stub", workers=1)
+    assert [record["frame"] for record in records] == [2]
+    assert skipped == 1
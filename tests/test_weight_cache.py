@@ -0,0 +1,64 @@
+import os
+import time
+
+import numpy as np
+
+from weight_cache import WeightCache, params_key
+from wrap_params import WrapParams
+from wrap_weights import BONE_NAMES
+
+
+def cached_weights(seed, count=5):
+    weights = np.zeros((count, len(BONE_NAMES)))
+    weights[:, seed % len(BONE_NAMES)] = np.linspace(0.2, 1.0, count)
+    return weights
+
+
+def age(cache, params, seconds):
+    # 最終使用時刻を seconds 秒前にする（同じ時刻になって LRU の順番が決まらないようにする）
+    when = time.time() - seconds
+    os.utime(cache.path_for(params_key(params)), (when, when))
+
+
+def test_evicts_least_recently_used(tmp_path):
+    # max_entries=2 で A, B を入れて A を読み、C を入れると、最後に使ったのが古い B だけが消える
+    cache = WeightCache(str(tmp_path), max_entries=2)
+    a, b, c = (WrapParams(number_cuts=cuts) for cuts in (10, 11, 12))
+    cache.put(a, cached_weights(0))
+    age(cache, a, 30)
+    cache.put(b, cached_weights(1))
+    age(cache, b, 20)
+    np.testing.assert_allclose(cache.get(a), cached_weights(0), atol=1e-6)
+    cache.put(c, cached_weights(2))
+
+    assert sorted(os.listdir(tmp_path)) == sorted(params_key(p) + ".npz" for p in (a, c))
+    assert cache.get(b) is None
+    np.testing.assert_allclose(cache.get(a), cached_weights(0), atol=1e-6)
+    np.testing.assert_allclose(cache.get(c), cached_weights(2), atol=1e-6)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_vertex_count_mismatch_is_a_miss(tmp_path):
+    # 頂点数が違うキャッシュ（別の並びのメッシュで保存したもの）は使わない
+    cache = WeightCache(str(tmp_path))
+    params = WrapParams(number_cuts=10)
+    cache.put(params, cached_weights(0, count=5))
+    assert cache.get(params, vertex_count=6) is None
+    assert (cache.hits, cache.misses) == (0, 1)
+    np.testing.assert_allclose(cache.get(params, vertex_count=5), cached_weights(0, count=5), atol=1e-6)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_get_or_compute_computes_once(tmp_path):
+    cache = WeightCache(str(tmp_path))
+    params = WrapParams(number_cuts=10)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return cached_weights(3)
+
+    for _ in range(2):
+        np.testing.assert_allclose(cache.get_or_compute(params, compute), cached_weights(3), atol=1e-6)
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
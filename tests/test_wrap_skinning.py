@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from paper_mesh import paper_mesh_arrays
+from wrap_params import WrapParams
+from wrap_rig import fold_bones
+from wrap_skinning import evaluate_frames
+from wrap_weights import BONE_NAMES, compute_fold_weights, paper_matrix_world, to_world
+
+
+PARAMS = WrapParams()
+BONES = fold_bones(PARAMS)
+
+
+def one_bone_weights(count, bone, weight=1.0):
+    weights = np.zeros((count, len(BONE_NAMES)))
+    weights[:, BONE_NAMES.index(bone)] = weight
+    return weights
+
+
+def fold_keys(*bone_angles):
+    # フレーム1で0度、フレーム10で指定の角度になるキー（回転軸は X）
+    keyframes = []
+    for bone, angle in bone_angles:
+        keyframes += [(bone, 0, 1, 0), (bone, 0, 10, angle)]
+    return tuple(keyframes)
+
+
+def test_rest_pose_keeps_vertices():
+    # どのボーンも0度なら、ウェイトがあっても頂点は動かない
+    vertices, _ = paper_mesh_arrays(PARAMS)
+    rest_co = to_world(vertices, paper_matrix_world(PARAMS))
+    weights = compute_fold_weights(rest_co, PARAMS)
+    deformed = evaluate_frames(rest_co, weights, BONES, [1, 10], fold_keys(("FoldBone_Front_Bottom", 0)))
+    np.testing.assert_allclose(deformed, np.repeat(rest_co[None], 2, axis=0).astype(np.float32), atol=1e-6)
+
+
+def test_front_bottom_stands_up():
+    # 手前の辺から d の点は、-90度で手前の面に沿って高さ d に立ち上がる
+    half_depth = PARAMS.half_depth
+    distances = np.array([0.1, 0.5, 1.2])
+    rest_co = np.column_stack((np.full(3, 0.3), -half_depth - distances, np.zeros(3)))
+    weights = one_bone_weights(3, "FoldBone_Front_Bottom")
+    deformed = evaluate_frames(rest_co, weights, BONES, [10], fold_keys(("FoldBone_Front_Bottom", -90)))
+    expected = np.column_stack((np.full(3, 0.3), np.full(3, -half_depth), distances))
+    np.testing.assert_allclose(deformed[0], expected, atol=1e-5)
+
+
+def test_left_side_stands_up():
+    # 左の辺から d の点は、+90度で左の面に沿って高さ d に立ち上がる
+    half_width = PARAMS.half_width
+    rest_co = np.array([[-half_width - 0.4, 0.2, 0.0], [-half_width - 1.1, -0.5, 0.0]])
+    weights = one_bone_weights(2, "FoldBone_Left_Side")
+    deformed = evaluate_frames(rest_co, weights, BONES, [10], fold_keys(("FoldBone_Left_Side", 90)))
+    expected = [[-half_width, 0.2, 0.4], [-half_width, -0.5, 1.1]]
+    np.testing.assert_allclose(deformed[0], expected, atol=1e-5)
+
+
+def test_child_bone_follows_parent():
+    # 子ボーン（Front_Top）だけにウェイトがある頂点も、親ボーン（Front_Bottom）の回転で一緒に動く
+    half_depth = PARAMS.half_depth
+    rest_co = np.array([[0.3, -half_depth - 0.4, 0.0]])
+    weights = one_bone_weights(1, "FoldBone_Front_Top")
+    deformed = evaluate_frames(
+        rest_co, weights, BONES, [10], fold_keys(("FoldBone_Front_Bottom", -90), ("FoldBone_Front_Top", 0)),
+    )
+    np.testing.assert_allclose(deformed[0], [[0.3, -half_depth, 0.4]], atol=1e-5)
+
+
+def test_weights_are_normalized():
+    # アーマチュアモディファイアと同じく、ウェイトの合計で割る（1本だけなら 0.5 でも 1.0 と同じ）
+    half_depth = PARAMS.half_depth
+    rest_co = np.array([[0.3, -half_depth - 0.4, 0.0]])
+    keyframes = fold_keys(("FoldBone_Front_Bottom", -90))
+    full = evaluate_frames(rest_co, one_bone_weights(1, "FoldBone_Front_Bottom"), BONES, [10], keyframes)
+    half = evaluate_frames(rest_co, one_bone_weights(1, "FoldBone_Front_Bottom", 0.5), BONES, [10], keyframes)
+    np.testing.assert_allclose(half, full, atol=1e-6)
+
+    # 動かないボーンと半分ずつなら、立ち上がった位置と元の位置の中間になる
+    weights = one_bone_weights(1, "FoldBone_Front_Bottom") + one_bone_weights(1, "FoldBone_Left_Side")
+    blended = evaluate_frames(rest_co, weights, BONES, [10], keyframes)
+    np.testing.assert_allclose(blended[0], (full[0] + rest_co) / 2, atol=1e-5)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7])
+def test_chunks_match_single_pass(chunk_size):
+    # フレームを分けて計算しても結果は変わらない
+    vertices, _ = paper_mesh_arrays(PARAMS)
+    rest_co = to_world(vertices, paper_matrix_world(PARAMS))
+    weights = compute_fold_weights(rest_co, PARAMS)
+    frames = np.arange(1, 191, 9)
+    whole = evaluate_frames(rest_co, weights, BONES, frames, chunk_size=len(frames))
+    np.testing.assert_array_equal(evaluate_frames(rest_co, weights, BONES, frames, chunk_size=chunk_size), whole)
@@ -0,0 +1,34 @@
+import math
+
+import numpy as np
+import pytest
+
+from wrap_timeline import KEYFRAMES, drop_hold_keys, evaluate_channel, keyframe_channels
+
+FRAMES = np.arange(1, 191)
+CHANNELS = keyframe_channels(KEYFRAMES)
+
+
+@pytest.mark.parametrize("channel", sorted(CHANNELS))
+def test_drop_hold_keys_keeps_values(channel):
+    # 保持のキーを取り除いても、フレーム1-190のどのフレームでも値は変わらない
+    keys = CHANNELS[channel]
+    np.testing.assert_allclose(
+        evaluate_channel(drop_hold_keys(keys), FRAMES), evaluate_channel(keys, FRAMES), rtol=0, atol=1e-12,
+    )
+
+
+def test_drop_hold_keys_drops_leading_and_trailing_holds():
+    # Left_Side：フレーム1-130の0度と、フレーム165-190の90度は片側のキーだけ残る
+    keys = CHANNELS[("FoldBone_Left_Side", 0)]
+    assert drop_hold_keys(keys) == [(130, 0.0), (150, math.radians(60)), (165, math.radians(90))]
+
+
+def test_drop_hold_keys_keeps_both_ends_of_inner_hold():
+    # 途中の保持区間は両端のキーを残し、間のキーだけを取り除く
+    keys = [(1, 0.0), (10, 1.0), (20, 1.0), (30, 1.0), (40, 0.0)]
+    assert drop_hold_keys(keys) == [(1, 0.0), (10, 1.0), (30, 1.0), (40, 0.0)]
+    frames = np.arange(1, 41)
+    np.testing.assert_allclose(
+        evaluate_channel(drop_hold_keys(keys), frames), evaluate_channel(keys, frames), rtol=0, atol=1e-12,
+    )
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from paper_mesh import paper_grid
+from wrap_params import WrapParams
+from wrap_weights import compute_fold_weights, paper_matrix_world, to_world
+
+
+# 元の scripting.py の頂点ごとの if/elif を、bpy なしでそのまま書き写したもの
+# 戻り値は (Front_Bottom, Front_Top, Left_Side, Left_Middle, Left_Front_Triangle, Left_Top)
+def branch_weights(x, y, params):
+    half_width = params.half_width
+    half_depth = params.half_depth
+    box_height = params.box_height
+    paper_corner_y = params.paper_corner_y
+    paper_left_edge = -params.paper_size / 2 + params.paper_offset_x
+    left_distance = abs(paper_left_edge + half_width)
+
+    front_bottom = front_top = left_side = left_middle = left_front_triangle = left_top = 0.0
+    if abs(x) <= half_width and abs(y) <= half_depth:
+        pass
+    elif y < -half_depth and x >= -half_width:
+        distance_from_bottom = abs(y + half_depth)
+        if distance_from_bottom > box_height:
+            distance_from_top_fold = distance_from_bottom - box_height
+            max_distance = abs(paper_corner_y + half_depth) - box_height
+            front_bottom = max(0.0, 1.0 - (distance_from_top_fold / max_distance))
+            front_top = 1.0
+        else:
+            front_bottom = min(1.0, distance_from_bottom / 0.5)
+    elif x < -half_width:
+        distance_from_left = abs(x + half_width)
+        base_weight = min(1.0, distance_from_left / 0.5)
+        distance_ratio = distance_from_left / left_distance if left_distance > 0.01 else 0
+        left_side = base_weight
+        if distance_ratio >= 0.5:
+            left_middle = (distance_ratio - 0.5) * 2.0 * base_weight
+
+        y_bone_contact_center = -half_depth - box_height / 2
+        y_tolerance = 0.5
+        if y_bone_contact_center - y_tolerance <= y <= y_bone_contact_center + y_tolerance:
+            y_influence = 1.0 - (abs(y - y_bone_contact_center) / y_tolerance)
+            y_influence = max(0.0, min(1.0, y_influence))
+            x_influence = 1.0
+            if distance_from_left > 0:
+                x_influence = max(0.0, 1.0 - distance_from_left / box_height)
+            left_front_triangle = y_influence * x_influence
+        left_top = base_weight
+    return front_bottom, front_top, left_side, left_middle, left_front_triangle, left_top
+
+
+@pytest.mark.parametrize("box_dims", [(3, 2, 1.5), (2, 3, 1), (4, 1.5, 2.5), (1.2, 1.2, 0.6)])
+def test_matches_branch_logic(box_dims):
+    # 元の6本のボーンの列は、ランダムな点と包装紙のグリッドの頂点で元の計算と完全に一致する
+    params = WrapParams(box_dims=box_dims)
+    rng = np.random.default_rng(0)
+    random_co = np.column_stack((rng.uniform(-7, 7, (20000, 2)), np.zeros(20000)))
+    vertices, _ = paper_grid(params.paper_size, params.number_cuts)
+    world_co = np.concatenate((random_co, to_world(vertices, paper_matrix_world(params))))
+
+    weights = compute_fold_weights(world_co, params)
+    # 元のコードも VertexGroup.add() で 0.0〜1.0 に丸めて格納していた
+    expected = np.clip([branch_weights(x, y, params) for x, y, _ in world_co], 0.0, 1.0)
+    np.testing.assert_array_equal(weights[:, :6], expected)
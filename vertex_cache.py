@@ -0,0 +1,167 @@
+import os
+import struct
+import time
+
+import numpy as np
+
+
+# 包装紙の頂点座標をフレームごとに焼き込むキャッシュ
+# ファイルの中身：32バイトのヘッダー＋ float32 の (フレーム数, 頂点数, 3) の配列
+# 座標は包装紙オブジェクトのローカル座標（Mesh Cache モディファイアと同じ）
+
+MAGIC = b"WRAPVC01"
+VERSION = 1
+HEADER = struct.Struct("<8sIIiI")  # マジック、バージョン、頂点数、開始フレーム、フレーム数
+HEADER_SIZE = 32
+
+
+def write_header(f, vertex_count, frame_start, frame_count):
+    f.write(HEADER.pack(MAGIC, VERSION, vertex_count, frame_start, frame_count).ljust(HEADER_SIZE, b"\0"))
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        magic, version, vertex_count, frame_start, frame_count = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"頂点キャッシュの形式が違います: {path}")
+    return {"vertex_count": vertex_count, "frame_start": frame_start, "frame_count": frame_count}
+
+
+class VertexCacheWriter:
+    # フレームを1つずつ書き込む（全フレームをメモリに持たないので、長い・高解像度の焼き込みでも
+    # 使用メモリは増えない）
+
+    def __init__(self, path, vertex_count, frame_start, frame_count):
+        self.path = path
+        self.frame_start = frame_start
+        self.frame_count = frame_count
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            write_header(f, vertex_count, frame_start, frame_count)
+            f.truncate(HEADER_SIZE + frame_count * vertex_count * 3 * 4)
+        self.data = np.memmap(
+            path, dtype=np.float32, mode="r+", offset=HEADER_SIZE, shape=(frame_count, vertex_count, 3)
+        )
+
+    def write(self, frame, co):
+        self.data[frame - self.frame_start] = np.asarray(co, dtype=np.float32).reshape(-1, 3)
+
+    def close(self):
+        if self.data is not None:
+            self.data.flush()
+            self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_vertex_cache(path):
+    # 読み込み専用でメモリマップする（ヘッダー, (F, N, 3) の配列）
+    header = read_header(path)
+    data = np.memmap(
+        path,
+        dtype=np.float32,
+        mode="r",
+        offset=HEADER_SIZE,
+        shape=(header["frame_count"], header["vertex_count"], 3),
+    )
+    return header, data
+
+
+def bake(path, frame_start, frame_end, evaluate_frame, vertex_count):
+    # evaluate_frame(frame) が返す (N, 3) の座標を frame_start〜frame_end まで順に書き込む
+    with VertexCacheWriter(path, vertex_count, frame_start, frame_end - frame_start + 1) as writer:
+        for frame in range(frame_start, frame_end + 1):
+            writer.write(frame, evaluate_frame(frame))
+    return path
+
+
+def bake_rig(path, rest_co, weights, bones, matrix_world, frame_start, frame_end, chunk_size=16, **kwargs):
+    # Blenderなしで、wrap_skinning の変形計算を chunk_size フレームずつ焼き込む
+    # rest_co はワールド座標。キャッシュには matrix_world の逆行列でローカル座標に戻して書く
+    from wrap_skinning import evaluate_frames
+
+    inverse = np.linalg.inv(np.asarray(matrix_world, dtype=np.float64))
+    frame_count = frame_end - frame_start + 1
+    with VertexCacheWriter(path, len(rest_co), frame_start, frame_count) as writer:
+        for start in range(frame_start, frame_end + 1, chunk_size):
+            frames = np.arange(start, min(start + chunk_size, frame_end + 1))
+            deformed = evaluate_frames(rest_co, weights, bones, frames, **kwargs)
+            local = deformed @ inverse[:3, :3].T.astype(np.float32) + inverse[:3, 3].astype(np.float32)
+            for frame, co in zip(frames, local):
+                writer.write(int(frame), co)
+    return path
+
+
+def export_pc2(cache_path, pc2_path, sample_rate=1.0):
+    # Mesh Cache モディファイア用の PC2 形式（リトルエンディアン）に書き出す
+    header, data = open_vertex_cache(cache_path)
+    with open(pc2_path, "wb") as f:
+        f.write(struct.pack(
+            "<12siiffi",
+            b"POINTCACHE2\0",
+            1,
+            header["vertex_count"],
+            float(header["frame_start"]),
+            sample_rate,
+            header["frame_count"],
+        ))
+        for frame in data:
+            f.write(np.ascontiguousarray(frame, dtype="<f4").tobytes())
+    return pc2_path
+
+
+def export_mdd(cache_path, mdd_path, fps=24.0):
+    # Mesh Cache モディファイア用の MDD 形式（ビッグエンディアン、時刻は秒）に書き出す
+    header, data = open_vertex_cache(cache_path)
+    frame_count = header["frame_count"]
+    times = (np.arange(frame_count) + header["frame_start"] - 1) / fps
+    with open(mdd_path, "wb") as f:
+        f.write(struct.pack(">ii", frame_count, header["vertex_count"]))
+        f.write(times.astype(">f4").tobytes())
+        for frame in data:
+            f.write(np.ascontiguousarray(frame, dtype=">f4").tobytes())
+    return mdd_path
+
+
+def read_time_per_frame(cache_path):
+    # キャッシュから1フレーム分の座標を読み出す平均時間[秒]
+    _, data = open_vertex_cache(cache_path)
+    start = time.perf_counter()
+    for frame in data:
+        np.array(frame)
+    return (time.perf_counter() - start) / max(len(data), 1)
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    from paper_mesh import paper_mesh_arrays
+    from wrap_params import WrapParams
+    from wrap_rig import fold_bones
+    from wrap_weights import compute_fold_weights, paper_matrix_world, to_world
+
+    # Blenderなしで焼き込み、サイズと1フレームの読み込み時間を計算時間と比べる
+    number_cuts = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    params = WrapParams(number_cuts=number_cuts)
+    vertices, faces = paper_mesh_arrays(params)
+    matrix_world = paper_matrix_world(params)
+    rest_co = to_world(vertices, matrix_world)
+    weights = compute_fold_weights(rest_co, params)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "WrappingPaper.vcache")
+        start = time.perf_counter()
+        bake_rig(path, rest_co, weights, fold_bones(params), matrix_world, 1, 190)
+        evaluate_time = (time.perf_counter() - start) / 190
+        read_time = read_time_per_frame(path)
+        pc2_path = export_pc2(path, os.path.join(directory, "WrappingPaper.pc2"))
+        print(f"{len(vertices)} 頂点 × 190 フレーム: {os.path.getsize(path) / 2 ** 20:.1f} MiB "
+              f"(PC2 {os.path.getsize(pc2_path) / 2 ** 20:.1f} MiB)")
+        print(f"1フレームあたり: 計算 {evaluate_time * 1000:.2f} ms / 読み込み {read_time * 1000:.3f} ms")
@@ -0,0 +1,116 @@
+import dataclasses
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from paper_mesh import mesh_layout_key
+from wrap_weights import BONE_NAMES, from_sparse, to_sparse
+
+
+# ウェイトの計算方法を変えたら上げる（古いキャッシュを使わないようにする）
+CACHE_VERSION = 4
+
+
+def params_key(params):
+    # 包み方のパラメータとメッシュの頂点の並びから決まるキャッシュのキー
+    payload = json.dumps(
+        {"version": CACHE_VERSION, "mesh_layout": mesh_layout_key(params), "params": dataclasses.asdict(params)},
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def save_sparse_weights(path, weights):
+    # ボーンごとに「ウェイトが0でない頂点のインデックス」と「ウェイト」だけを .npz に保存する
+    arrays = {"vertex_count": np.array(len(weights))}
+    for name, (indices, bone_weights) in zip(BONE_NAMES, to_sparse(weights)):
+        arrays[f"{name}_indices"] = indices.astype(np.uint32)
+        arrays[f"{name}_weights"] = bone_weights
+
+    # 途中で止まっても壊れたファイルが残らないように、一時ファイルに書いてから置き換える
+    # （複数のワーカーが同じキャッシュに書くので、一時ファイルの名前はプロセスごとに変える）
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_sparse_weights(path):
+    # save_sparse_weights() で保存したファイルを (N, len(BONE_NAMES)) の配列に戻す
+    with np.load(path) as data:
+        sparse = [(data[f"{name}_indices"], data[f"{name}_weights"]) for name in BONE_NAMES]
+        return from_sparse(sparse, int(data["vertex_count"]))
+
+
+class WeightCache:
+    # パラメータのハッシュをキーにしたウェイトのディスクキャッシュ
+    # max_entries を超えたら、最後に使ってから時間が経っているものから削除する（LRU）
+
+    def __init__(self, directory, max_entries=32):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, params, vertex_count=None):
+        path = self.path_for(params_key(params))
+        try:
+            weights = load_sparse_weights(path)
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+        if vertex_count is not None and len(weights) != vertex_count:
+            self.misses += 1
+            return None
+        # 最終使用時刻を更新（LRUの順番に使う。読んだ直後に他のワーカーが削除した場合はそのまま使う）
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return weights
+
+    def put(self, params, weights):
+        save_sparse_weights(self.path_for(params_key(params)), weights)
+        self.evict()
+
+    def get_or_compute(self, params, compute, vertex_count=None):
+        weights = self.get(params, vertex_count)
+        if weights is None:
+            weights = compute()
+            self.put(params, weights)
+        return weights
+
+    def evict(self):
+        # 他のワーカーが同時に削除したファイルは飛ばす
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except FileNotFoundError:
+                    pass
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def summary(self):
+        return f"ウェイトキャッシュ: ヒット {self.hits} 回 / ミス {self.misses} 回"
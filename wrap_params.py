@@ -0,0 +1,91 @@
+import math
+from dataclasses import dataclass
+
+
+# 包み方（箱・包装紙・ウェイトの許容値）を決めるパラメータ
+# scripting.py の定数をまとめたもので、bpy に依存しない
+@dataclass(frozen=True)
+class WrapParams:
+    box_dims: tuple = (3, 2, 1.5)  # 箱の寸法（幅、奥行き、高さ）
+    paper_size: float = 8
+    paper_offset_x: float = -1.0  # 左に移動する量
+    paper_offset_y: float = -1.0  # 手前に移動する量
+    paper_rotation_deg: float = 45.0  # Z軸まわりの回転（斜め配置）
+    number_cuts: int = 60
+    tessellation: str = "uniform"  # "uniform"：一様グリッド、"adaptive"：折り目の近くだけ細かくする
+    y_tolerance: float = 0.5  # 三角形織り込みボーンの影響範囲の許容値
+    falloff: float = 0.5  # 折り目からのグラデーションの距離
+    layer_offset: float = 0.05  # 上面で重なる紙の間隔（先に折った奥の紙の上に手前の紙を重ねる）
+
+    @property
+    def half_width(self):
+        return self.box_dims[0] / 2
+
+    @property
+    def half_depth(self):
+        return self.box_dims[1] / 2
+
+    @property
+    def box_height(self):
+        return self.box_dims[2]
+
+    @property
+    def paper_corner_y(self):
+        # 包装紙が45度回転しているので、手前の角は (0, -paper_size/2, 0) の位置にある
+        return -self.paper_size / 2
+
+    @property
+    def paper_left_edge(self):
+        return -self.paper_size / 2 + self.paper_offset_x
+
+    @property
+    def left_distance(self):
+        return abs(self.paper_left_edge + self.half_width)
+
+    @property
+    def left_middle_point(self):
+        return -self.half_width - (self.left_distance / 2)
+
+    @property
+    def y_bone_contact_center(self):
+        # bone_left_side が90度立ち上がった後、三角形ボーンと接触する包装紙の
+        # 立ち上がり前のY座標（回転軸から手前方向に box_height/2）
+        return -self.half_depth - self.box_height / 2
+
+    @property
+    def paper_back_corner_y(self):
+        # 奥の角も手前の角と対称に (0, paper_size/2, 0) の位置とみなす
+        return self.paper_size / 2
+
+    @property
+    def paper_corners(self):
+        # 包装紙の四隅のワールド座標 ((x, y), ...)（paper_matrix_world と同じ回転とオフセット）
+        c = math.cos(self.paper_rotation)
+        s = math.sin(self.paper_rotation)
+        half = self.paper_size / 2
+        return tuple(
+            (c * x - s * y + self.paper_offset_x, s * x + c * y + self.paper_offset_y)
+            for x, y in ((-half, -half), (half, -half), (half, half), (-half, half))
+        )
+
+    @property
+    def paper_right_edge(self):
+        # 回転した包装紙のいちばん右の角のX座標（右側の紙はここまで届く）
+        return max(x for x, _ in self.paper_corners)
+
+    @property
+    def right_distance(self):
+        return abs(self.paper_right_edge - self.half_width)
+
+    @property
+    def right_middle_point(self):
+        return self.half_width + (self.right_distance / 2)
+
+    @property
+    def y_back_contact_center(self):
+        # 右側の三角形織り込みボーンが奥の面で接触する位置（y_bone_contact_center と点対称）
+        return self.half_depth + self.box_height / 2
+
+    @property
+    def paper_rotation(self):
+        return math.radians(self.paper_rotation_deg)
@@ -0,0 +1,210 @@
+from collections import namedtuple
+
+
+# 折り目のボーン1本分（ヘッド・テールはアーマチュア空間の座標、parent は親ボーンの名前）
+FoldBone = namedtuple("FoldBone", ("name", "head", "tail", "parent"))
+
+# 包装紙の領域（箱の底面の外側）
+# axis（0：X、1：Y）の方向に箱の辺 edge より外側（side：-1 / +1）にある帯と、
+# corners に挙げた隣の角（もう一方の軸の -1 / +1 の側）からなる
+# 各頂点はどれか1つの領域にだけ含まれる（底面の頂点はどの領域にも含まれず、動かない）
+FoldRegion = namedtuple("FoldRegion", ("name", "axis", "side", "edge", "corners"))
+
+# ボーン1本分の定義：ボーン、ウェイトを受ける領域の名前、ウェイトの減衰 (種類, 引数...)
+# 減衰は領域の辺からの距離と辺に沿った座標の式（種類は wrap_weights.FALLOFFS を参照）
+FoldSpec = namedtuple("FoldSpec", ("bone", "region", "falloff"))
+
+
+def fold_regions(params):
+    # 4つの側面の領域。箱の外側の8つのマス（4つの帯と4つの角）をちょうど1回ずつ含む
+    # 角の割り当ては元のウェイト計算（手前：右手前の角、左側：左手前・左奥の角）に合わせてあり、
+    # 点対称ではない（左奥の角は左側の紙と、その点対称の位置の右手前の角は手前の紙と一緒に動き、
+    # 奥は角を持たない）。このため包装紙を中央に置いても変形は点対称にならない
+    # （paper_offset (0, 0)、60分割のフレーム90で、2つの角の 612 頂点が最大 7.8 ずれる）
+    half_width = params.half_width
+    half_depth = params.half_depth
+    return (
+        # 手前：手前の辺より手前（右手前の角を含む）
+        FoldRegion("front", 1, -1, -half_depth, (1,)),
+        # 左側：左の辺より左（左手前・左奥の角を含む）
+        FoldRegion("left", 0, -1, -half_width, (-1, 1)),
+        # 右側：右の辺より右（右奥の角を含む）
+        FoldRegion("right", 0, 1, half_width, (1,)),
+        # 奥：奥の辺より奥
+        FoldRegion("back", 1, 1, half_depth, ()),
+    )
+
+
+def fold_spec(params):
+    # 斜め包みのボーンとウェイトの定義。親ボーンが子ボーンより前に並ぶ
+    # アーマチュアの作成（scripting.py）、ウェイトの計算（wrap_weights）、
+    # Blenderなしの変形計算（wrap_skinning）はすべてこの定義から作る
+    half_width = params.half_width
+    half_depth = params.half_depth
+    box_height = params.box_height
+    falloff = params.falloff
+    y_tolerance = params.y_tolerance
+    paper_corner_y = params.paper_corner_y
+    paper_back_corner_y = params.paper_back_corner_y
+    paper_left_edge = params.paper_left_edge
+    paper_right_edge = params.paper_right_edge
+    left_middle_point = params.left_middle_point
+    right_middle_point = params.right_middle_point
+    # 三角形の範囲
+    triangle_extent = params.left_distance / 2
+    right_triangle_extent = params.right_distance / 2
+
+    return (
+        # === 手前の面：商品の手前の辺（底面）から上面までの折り目 ===
+        # ボーンの根本：商品の手前の辺の中心（底面）、先端：商品の手前の辺の上面
+        # 底面から上面までは折り目から falloff でウェイト1.0、上面より先は先端に向かって 0.0 まで下げる
+        FoldSpec(
+            FoldBone(
+                "FoldBone_Front_Bottom",
+                (0, -half_depth, 0),
+                (0, -half_depth, box_height),
+                None,
+            ),
+            "front",
+            ("ramp_fade", falloff, box_height, abs(paper_corner_y + half_depth) - box_height),
+        ),
+        # 商品の上面から包装紙の先端までの折り目（bone_front_bottomの子）
+        # ボーンの根本は立ち上げる前の上面の折り目（手前の辺から箱の高さ）、先端は包装紙の手前の角
+        # 先に折った奥の紙に重なるので、折り目を layer_offset だけ高くする
+        # 上面より先の部分だけがウェイト1.0
+        FoldSpec(
+            FoldBone(
+                "FoldBone_Front_Top",
+                (0, -half_depth - box_height - params.layer_offset, 0),
+                (0, paper_corner_y, 0),
+                "FoldBone_Front_Bottom",
+            ),
+            "front",
+            ("step", box_height),
+        ),
+        # === 左側の面：垂直に立ち上げるボーン ===
+        # 1. 基本の左側ボーン（商品の手前左下の角から中間地点まで）
+        FoldSpec(
+            FoldBone(
+                "FoldBone_Left_Side",
+                (-half_width, -half_depth, 0),
+                (left_middle_point, -half_depth, 0),
+                None,
+            ),
+            "left",
+            ("ramp", falloff),
+        ),
+        # 2. 中間ボーン（45度の位置、内側に織り込む動作用）：中間地点から左側の包装紙の端まで
+        # 中間地点より外側だけが影響を受ける
+        FoldSpec(
+            FoldBone(
+                "FoldBone_Left_Middle",
+                (left_middle_point, -half_depth, 0),
+                (paper_left_edge, -half_depth, 0),
+                "FoldBone_Left_Side",
+            ),
+            "left",
+            ("outer_ramp", falloff, params.left_distance),
+        ),
+        # === 手前側面の三角形織り込み用ボーン ===
+        # 左側の包装紙が垂直に立ち上がった時、手前側面に飛び出る三角形部分を内側（谷折り）に折り込む
+        # 商品の高さの半分の位置から左方向（X軸負方向）に伸ばす
+        # ウェイトは接触する帯（Y方向）の中だけ
+        FoldSpec(
+            FoldBone(
+                "FoldBone_Left_Front_Triangle",
+                (-half_width, -half_depth, box_height / 2),
+                (-half_width - triangle_extent, -half_depth, box_height / 2),
+                "FoldBone_Left_Side",
+            ),
+            "left",
+            ("band", box_height, params.y_bone_contact_center, y_tolerance),
+        ),
+        # === 左側の包装紙を上面に折り返すボーン ===
+        # 商品の手前左上の角から、上面に沿って右方向（X軸正方向）に上面の中心まで
+        # 左側の包装紙全体が影響を受ける
+        FoldSpec(
+            FoldBone(
+                "FoldBone_Left_Top",
+                (-half_width, -half_depth, box_height),
+                (0, -half_depth, box_height),
+                "FoldBone_Left_Side",
+            ),
+            "left",
+            ("ramp", falloff),
+        ),
+        # === 右側の面：Side / Middle / Back_Triangle のボーンは左側と点対称（奥の辺を軸に立ち上げ、三角形は奥の面に織り込む） ===
+        # 領域は点対称ではない（fold_regions を参照）
+        # 右側の紙は回転した包装紙の角（paper_right_edge）まで届き、箱の高さより長いので、
+        # 左側と違って上面より先の部分を Right_Top で上面に折り返す（Side は上面の手前で減衰させる）
+        FoldSpec(
+            FoldBone(
+                "FoldBone_Right_Side",
+                (half_width, half_depth, 0),
+                (right_middle_point, half_depth, 0),
+                None,
+            ),
+            "right",
+            ("ramp_fade", falloff, box_height, falloff),
+        ),
+        FoldSpec(
+            FoldBone(
+                "FoldBone_Right_Middle",
+                (right_middle_point, half_depth, 0),
+                (paper_right_edge, half_depth, 0),
+                "FoldBone_Right_Side",
+            ),
+            "right",
+            ("outer_ramp", falloff, params.right_distance),
+        ),
+        FoldSpec(
+            FoldBone(
+                "FoldBone_Right_Back_Triangle",
+                (half_width, half_depth, box_height / 2),
+                (half_width + right_triangle_extent, half_depth, box_height / 2),
+                "FoldBone_Right_Side",
+            ),
+            "right",
+            ("band", box_height, params.y_back_contact_center, y_tolerance),
+        ),
+        # 立ち上げる前の上面の折り目（右の辺から箱の高さ）から右側の包装紙の端まで
+        # 上面より先の部分だけがウェイト1.0
+        FoldSpec(
+            FoldBone(
+                "FoldBone_Right_Top",
+                (half_width + box_height, half_depth, 0),
+                (paper_right_edge, half_depth, 0),
+                "FoldBone_Right_Side",
+            ),
+            "right",
+            ("step", box_height),
+        ),
+        # === 奥の面：手前の面と対称（奥の辺から上面まで立ち上げ、上面より先を手前に折り返す） ===
+        # 奥の紙は手前の紙より先に折って下に重ねるので、上面の折り目の丸み（減衰）を手前より短くする
+        FoldSpec(
+            FoldBone(
+                "FoldBone_Back_Bottom",
+                (0, half_depth, 0),
+                (0, half_depth, box_height),
+                None,
+            ),
+            "back",
+            ("ramp_fade", falloff, box_height, falloff / 2),
+        ),
+        FoldSpec(
+            FoldBone(
+                "FoldBone_Back_Top",
+                (0, half_depth + box_height, 0),
+                (0, paper_back_corner_y, 0),
+                "FoldBone_Back_Bottom",
+            ),
+            "back",
+            ("step", box_height),
+        ),
+    )
+
+
+def fold_bones(params):
+    # 斜め包みのボーン構成（fold_spec の順、親ボーンが子ボーンより前に並ぶ）
+    # scripting.py のアーマチュア作成と、Blenderなしの変形計算（wrap_skinning）の両方で使う
+    return tuple(spec.bone for spec in fold_spec(params))
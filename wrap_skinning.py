@@ -0,0 +1,151 @@
+import time
+
+import numpy as np
+
+from wrap_rig import fold_bones
+from wrap_timeline import KEYFRAMES, evaluate_keyframes
+from wrap_weights import BONE_NAMES, paper_matrix_world, to_sparse, to_world
+
+
+# Blenderなしで包装紙の変形を計算する（順運動学＋線形ブレンドスキニング）
+# アーマチュアはワールド原点にあるので、アーマチュア空間＝ワールド座標として計算する
+
+
+def bone_rest_matrix(head, tail, roll=0.0):
+    # ヘッド・テール・ロールからボーンのレスト行列（4x4、アーマチュア空間）を作る
+    # Blender の vec_roll_to_mat3_normalized と同じ計算（ボーンのY軸がヘッド→テールの向き）
+    head = np.asarray(head, dtype=np.float64)
+    nor = np.asarray(tail, dtype=np.float64) - head
+    nor /= np.linalg.norm(nor)
+    x, y, z = nor
+    theta = 1.0 + y
+    theta_alt = x * x + z * z
+    if theta > 6.1e-3 or theta_alt > 2.5e-4 ** 2:
+        if theta <= 6.1e-3:
+            theta = theta_alt * 0.5 + theta_alt * theta_alt * 0.125
+        rotation = np.array([
+            [1.0 - x * x / theta, x, -x * z / theta],
+            [-x, y, -z],
+            [-x * z / theta, z, 1.0 - z * z / theta],
+        ])
+    else:
+        # ボーンがほぼ -Y 方向を向いている場合
+        rotation = np.diag([-1.0, -1.0, 1.0])
+
+    if roll:
+        # ボーンの軸まわりのロール
+        k = np.array([[0.0, -z, y], [z, 0.0, -x], [-y, x, 0.0]])
+        roll_matrix = np.eye(3) + np.sin(roll) * k + (1.0 - np.cos(roll)) * (k @ k)
+        rotation = roll_matrix @ rotation
+
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation
+    matrix[:3, 3] = head
+    return matrix
+
+
+def rest_matrices(bones):
+    return np.stack([bone_rest_matrix(bone.head, bone.tail) for bone in bones])
+
+
+def euler_xyz_matrices(eulers):
+    # rotation_mode='XYZ' のオイラー角 (..., 3) を回転行列 (..., 3, 3) にする（R = Rz @ Ry @ Rx）
+    eulers = np.asarray(eulers, dtype=np.float64)
+    cx, cy, cz = np.cos(eulers[..., 0]), np.cos(eulers[..., 1]), np.cos(eulers[..., 2])
+    sx, sy, sz = np.sin(eulers[..., 0]), np.sin(eulers[..., 1]), np.sin(eulers[..., 2])
+    matrices = np.empty(eulers.shape[:-1] + (3, 3))
+    matrices[..., 0, 0] = cy * cz
+    matrices[..., 0, 1] = sy * sx * cz - cx * sz
+    matrices[..., 0, 2] = sy * cx * cz + sx * sz
+    matrices[..., 1, 0] = cy * sz
+    matrices[..., 1, 1] = sy * sx * sz + cx * cz
+    matrices[..., 1, 2] = sy * cx * sz - sx * cz
+    matrices[..., 2, 0] = -sy
+    matrices[..., 2, 1] = cy * sx
+    matrices[..., 2, 2] = cy * cx
+    return matrices
+
+
+def pose_matrices(bones, rest, eulers):
+    # 各フレームのボーンのポーズ行列 (F, B, 4, 4)
+    # pose[子] = pose[親] @ inv(rest[親]) @ rest[子] @ 回転（親ボーンが先に並んでいること）
+    eulers = np.asarray(eulers, dtype=np.float64)
+    frame_count = len(eulers)
+    local = np.zeros((frame_count, len(bones), 4, 4))
+    local[..., :3, :3] = euler_xyz_matrices(eulers)
+    local[..., 3, 3] = 1.0
+
+    index = {bone.name: i for i, bone in enumerate(bones)}
+    inverse_rest = np.linalg.inv(rest)
+    poses = np.empty_like(local)
+    for i, bone in enumerate(bones):
+        if bone.parent is None:
+            poses[:, i] = rest[i] @ local[:, i]
+        else:
+            parent = index[bone.parent]
+            poses[:, i] = poses[:, parent] @ (inverse_rest[parent] @ rest[i]) @ local[:, i]
+    return poses
+
+
+def skinning_matrices(bones, rest, eulers):
+    # レスト姿勢の座標をポーズ後の座標に移す行列 (F, B, 4, 4)
+    return pose_matrices(bones, rest, eulers) @ np.linalg.inv(rest)
+
+
+def skin(rest_co, sparse_weights, skin_matrices):
+    # 線形ブレンドスキニング。rest_co は (N, 3) のワールド座標、sparse_weights は
+    # ボーンごとの（頂点インデックス, ウェイト）、skin_matrices は (F, B, 4, 4)
+    # Blender のアーマチュアモディファイアと同じく、ウェイトの合計で正規化する
+    rest_co = np.asarray(rest_co, dtype=np.float64)
+    frame_count = len(skin_matrices)
+    offset = np.zeros((frame_count,) + rest_co.shape)
+    total = np.zeros(len(rest_co))
+    for bone, (indices, weights) in enumerate(sparse_weights):
+        if len(indices) == 0:
+            continue
+        co = rest_co[indices]
+        matrices = skin_matrices[:, bone]
+        moved = np.einsum("fij,nj->fni", matrices[:, :3, :3], co) + matrices[:, None, :3, 3]
+        offset[:, indices] += (moved - co) * weights[:, None]
+        total[indices] += weights
+
+    deformed = np.repeat(rest_co[None], frame_count, axis=0)
+    moving = total > 0.0001
+    deformed[:, moving] += offset[:, moving] / total[moving, None]
+    return deformed
+
+
+def evaluate_frames(rest_co, weights, bones, frames, keyframes=KEYFRAMES, chunk_size=32):
+    # 指定したフレームの包装紙の頂点座標 (F, N, 3)（float32、ワールド座標）
+    # weights は (N, B) の配列、または to_sparse() の形式
+    # メモリを抑えるため、chunk_size フレームずつ計算する
+    if isinstance(weights, np.ndarray):
+        weights = to_sparse(weights)
+    frames = np.atleast_1d(frames)
+    rest = rest_matrices(bones)
+    names = [bone.name for bone in bones]
+    result = np.empty((len(frames), len(rest_co), 3), dtype=np.float32)
+    for start in range(0, len(frames), chunk_size):
+        chunk = frames[start:start + chunk_size]
+        matrices = skinning_matrices(bones, rest, evaluate_keyframes(chunk, names, keyframes))
+        result[start:start + len(chunk)] = skin(rest_co, weights, matrices)
+    return result
+
+
+if __name__ == "__main__":
+    from paper_mesh import paper_mesh_arrays
+    from wrap_params import WrapParams
+    from wrap_weights import compute_fold_weights
+
+    # 全フレーム（1〜190）の変形をまとめて計算する時間
+    params = WrapParams()
+    vertices, faces = paper_mesh_arrays(params)
+    rest_co = to_world(vertices, paper_matrix_world(params))
+    weights = compute_fold_weights(rest_co, params)
+    bones = fold_bones(params)
+    assert [bone.name for bone in bones] == list(BONE_NAMES)
+
+    start = time.perf_counter()
+    deformed = evaluate_frames(rest_co, weights, bones, np.arange(1, 191))
+    elapsed = time.perf_counter() - start
+    print(f"{len(rest_co)} 頂点 × {len(deformed)} フレーム: {elapsed * 1000:.1f} ms")
@@ -0,0 +1,272 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+
+
+# 斜め包みのアニメーション（ボーン、回転軸、フレーム、角度[度]）
+# 回転軸は rotation_euler のインデックス（0=X, 1=Y, 2=Z）。表にない軸は常に0度
+# 値の変わらない「保持」のキーもそのまま書いておき、適用時に冗長なものを取り除く
+KEYFRAMES = (
+    # フレーム1: 初期位置（平らな状態）
+    ("FoldBone_Front_Bottom", 0, 1, 0),
+    ("FoldBone_Front_Top", 0, 1, 0),
+    ("FoldBone_Left_Side", 0, 1, 0),
+    ("FoldBone_Left_Middle", 0, 1, 0),
+    ("FoldBone_Left_Front_Triangle", 2, 1, 0),
+    ("FoldBone_Left_Top", 0, 1, 0),
+    ("FoldBone_Right_Side", 0, 1, 0),
+    ("FoldBone_Right_Middle", 0, 1, 0),
+    ("FoldBone_Right_Back_Triangle", 2, 1, 0),
+    ("FoldBone_Right_Top", 0, 1, 0),
+    ("FoldBone_Back_Bottom", 0, 1, 0),
+    ("FoldBone_Back_Top", 0, 1, 0),
+
+    # === 工程1：奥の紙を先に上面に折り、その上に手前の紙をかぶせる（フレーム1-90） ===
+    # 奥のボーンは手前と同じ向きなので、立ち上げの角度は符号が逆になる
+    # 奥の紙は上面の奥の辺で折れ、先端は上面の手前の辺より少し（既定の寸法で 0.16）先まで届く
+    # フレーム30: 奥の紙を垂直に立ち上げる
+    ("FoldBone_Back_Bottom", 0, 30, 90),
+    ("FoldBone_Back_Top", 0, 30, 0),
+    # フレーム50: 奥の紙を上面に折り返す
+    ("FoldBone_Back_Bottom", 0, 50, 90),
+    ("FoldBone_Back_Top", 0, 50, 90),
+    # フレーム60: 第1段階 - 90度上空に立ち上げる（商品の手前の面に沿って垂直にする）
+    ("FoldBone_Front_Bottom", 0, 60, -90),
+    ("FoldBone_Front_Top", 0, 60, 0),  # まだ折らない
+    ("FoldBone_Back_Bottom", 0, 60, 90),
+    ("FoldBone_Back_Top", 0, 60, 90),
+    # フレーム90: 第2段階 - 商品の上面の高さで90度折り曲げて覆いかぶせる
+    # bone2はbone1の子なので、bone1の-90度回転に対して、さらに+90度回転して合計0度（水平）にする
+    # 手前の紙は奥の紙より layer_offset だけ高い位置に重なる
+    ("FoldBone_Front_Bottom", 0, 90, -90),
+    ("FoldBone_Front_Top", 0, 90, 90),
+    ("FoldBone_Back_Bottom", 0, 90, 90),
+    ("FoldBone_Back_Top", 0, 90, 90),
+    # 左右のボーンは最初は動かない
+    ("FoldBone_Left_Side", 0, 90, 0),
+    ("FoldBone_Left_Middle", 0, 90, 0),
+    ("FoldBone_Left_Front_Triangle", 2, 90, 0),
+    ("FoldBone_Left_Top", 0, 90, 0),
+    ("FoldBone_Right_Side", 0, 90, 0),
+    ("FoldBone_Right_Middle", 0, 90, 0),
+    ("FoldBone_Right_Back_Triangle", 2, 90, 0),
+    ("FoldBone_Right_Top", 0, 90, 0),
+
+    # === 工程2：左側の紙を商品の左側面に沿わせて折ってから立ち上げる ===
+    # 右側の紙も同じフレームで立ち上げる（Right_Side の角度は左側と同じ。右側のボーンは左側と点対称）
+    # 右側の紙は回転した包装紙の角（X=4.56）まで届き、箱の高さ（1.5）より長い（幅 3.16）。
+    # 三角形は立ち上げる前に奥の面に織り込み（左側と逆向き）、上面より先の部分は
+    # フレーム165から190で上面に折り返す（上面の上 Z=1.5-1.58 に重なり、めり込みは増えない）
+    # [00:40 - 00:44] 三角形の織り込み開始（浮いている包装紙をZ軸で45度回転）
+    ("FoldBone_Left_Side", 0, 115, 0),
+    ("FoldBone_Left_Middle", 0, 115, 0),
+    ("FoldBone_Left_Front_Triangle", 2, 115, 45),
+    ("FoldBone_Left_Top", 0, 115, 0),
+    ("FoldBone_Right_Side", 0, 115, 0),
+    ("FoldBone_Right_Back_Triangle", 2, 115, -45),
+    # フレーム130: 三角形の織り込み完了（Z軸で90度、完全に上方向に折り曲げる）
+    ("FoldBone_Left_Side", 0, 130, 0),
+    ("FoldBone_Left_Middle", 0, 130, 0),
+    ("FoldBone_Left_Front_Triangle", 2, 130, 90),
+    ("FoldBone_Left_Top", 0, 130, 0),
+    ("FoldBone_Right_Side", 0, 130, 0),
+    ("FoldBone_Right_Back_Triangle", 2, 130, -90),
+    # [00:45 - 00:51] 左側面に沿わせた状態で垂直に立ち上げ開始
+    ("FoldBone_Left_Side", 0, 150, 60),
+    ("FoldBone_Left_Middle", 0, 150, 40),
+    ("FoldBone_Left_Front_Triangle", 2, 150, 90),
+    ("FoldBone_Left_Top", 0, 150, 0),
+    ("FoldBone_Right_Side", 0, 150, 60),
+    ("FoldBone_Right_Back_Triangle", 2, 150, -90),
+    # フレーム165: 完全に垂直に立ち上げ完了（中間部分は内側への織り込みを表現）
+    ("FoldBone_Left_Side", 0, 165, 90),
+    ("FoldBone_Left_Middle", 0, 165, 70),
+    ("FoldBone_Left_Front_Triangle", 2, 165, 90),
+    ("FoldBone_Left_Top", 0, 165, 0),
+    ("FoldBone_Right_Side", 0, 165, 90),
+    ("FoldBone_Right_Middle", 0, 165, 0),
+    ("FoldBone_Right_Back_Triangle", 2, 165, -90),
+    ("FoldBone_Right_Top", 0, 165, 0),
+    # [00:52 - 00:56] 商品の上面に折り返す（X軸で-90度回転）
+    ("FoldBone_Left_Side", 0, 190, 90),
+    ("FoldBone_Left_Middle", 0, 190, 90),
+    ("FoldBone_Left_Front_Triangle", 2, 190, 90),
+    ("FoldBone_Left_Top", 0, 190, -90),
+    ("FoldBone_Right_Side", 0, 190, 90),
+    ("FoldBone_Right_Middle", 0, 190, 90),
+    ("FoldBone_Right_Back_Triangle", 2, 190, -90),
+    ("FoldBone_Right_Top", 0, 190, 90),
+)
+
+
+def keyframe_channels(keyframes=KEYFRAMES):
+    # (ボーン, 回転軸) ごとに、フレーム順に並べた [(フレーム, 角度[ラジアン]), ...] にまとめる
+    # 同じフレームが複数回書かれている場合は後のものを使う
+    channels = defaultdict(dict)
+    for bone, axis, frame, angle in keyframes:
+        channels[(bone, axis)][frame] = math.radians(angle)
+    return {key: sorted(keys.items()) for key, keys in channels.items()}
+
+
+def animated_bones(keyframes=KEYFRAMES):
+    # 0度以外のキーを持つ（アニメーションで回転する）ボーンの名前
+    return {bone for bone, _, _, angle in keyframes if angle != 0}
+
+
+def drop_hold_keys(keys):
+    # 値の変わらない区間の途中にあるキー（保持のキー）を取り除く
+    # 自動クランプのハンドルでは、同じ値が続く区間は両端のキーだけで同じカーブになる
+    # 最初と最後の区間は外挿（一定）と同じなので片側のキーだけでよい
+    # （端になったキーの水平なハンドルの長さがわずかに変わるだけで、値は変わらない）
+    if len(keys) <= 1:
+        return list(keys)
+    kept = []
+    for i, (frame, value) in enumerate(keys):
+        same_as_prev = i > 0 and keys[i - 1][1] == value
+        same_as_next = i < len(keys) - 1 and keys[i + 1][1] == value
+        is_first = i == 0
+        is_last = i == len(keys) - 1
+        if same_as_prev and (same_as_next or is_last):
+            continue
+        if is_first and same_as_next:
+            continue
+        kept.append((frame, value))
+    # 全て同じ値の場合も1つは残す
+    return kept or [keys[0]]
+
+
+def bone_data_path(bone, data_path="rotation_euler"):
+    return f'pose.bones["{bone}"].{data_path}'
+
+
+def action_fcurve(action, datablock, data_path, index, group):
+    # アクションにFカーブを作る
+    # Blender 5.0 で Action.fcurves（スロットのない古いアクション）がなくなったので、その場合は
+    # fcurve_ensure_for_datablock（4.4 以降）でスロット・レイヤー・ストリップごと作る
+    # （アクションは datablock に割り当てておく）
+    if hasattr(action, "fcurves"):
+        return action.fcurves.new(data_path, index=index, action_group=group)
+    if datablock is None:
+        raise ValueError("このバージョンの Blender では、アクションを割り当てたオブジェクトの指定が必要です")
+    return action.fcurve_ensure_for_datablock(datablock, data_path, index=index, group_name=group)
+
+
+def apply_timeline(action, keyframes=KEYFRAMES, data_path="rotation_euler", datablock=None):
+    # アクションにFカーブを1回だけ作り、keyframe_points を add(n) と foreach_set でまとめて書き込む
+    # frame_set() を使わないので、メッシュの解像度に関係なく一定の時間で終わる
+    # datablock はアクションを割り当てたオブジェクト（Blender 5.0 以降で必要）
+    # 戻り値は（書き込んだキーの数, Fカーブの数）
+    total = 0
+    channels = keyframe_channels(keyframes)
+    for (bone, axis), keys in channels.items():
+        keys = drop_hold_keys(keys)
+        fcurve = action_fcurve(action, datablock, bone_data_path(bone, data_path), axis, bone)
+        fcurve.keyframe_points.add(len(keys))
+        fcurve.keyframe_points.foreach_set("co", np.array(keys, dtype=np.float32).ravel())
+        fcurve.update()
+        total += len(keys)
+    return total, len(channels)
+
+
+# --- Fカーブの評価（Blenderなしでアニメーションの値を求める） ---
+# keyframe_points.add() で作ったキーは、ベジェ補間・自動クランプのハンドルになる
+# 以下は Blender のハンドル計算（BKE_nurb_handle_calc）と同じ計算をFカーブ用に書き直したもの
+
+# Blender の自動ハンドルの長さの係数
+AUTO_HANDLE_FACTOR = 2.5614
+
+
+def auto_clamped_handles(keys):
+    # キーごとの左右のハンドルの座標 ((n, 2), (n, 2)) を返す
+    points = np.asarray(keys, dtype=np.float64).reshape(-1, 2)
+    count = len(points)
+    left = points.copy()
+    right = points.copy()
+    for i in range(count):
+        p2 = points[i]
+        if count == 1:
+            left[i] = p2 - (1.0, 0.0)
+            right[i] = p2 + (1.0, 0.0)
+            continue
+        p1 = points[i - 1] if i > 0 else 2 * p2 - points[i + 1]
+        p3 = points[i + 1] if i < count - 1 else 2 * p2 - p1
+
+        len_a = (p2[0] - p1[0]) or 1.0
+        len_b = (p3[0] - p2[0]) or 1.0
+        # 前後の区間の傾きの平均の向き
+        tvec = (p3 - p2) / len_b + (p2 - p1) / len_a
+        length = tvec[0] * AUTO_HANDLE_FACTOR
+        len_a = min(len_a, 5.0 * len_b)
+        len_b = min(len_b, 5.0 * len_a)
+        h1 = p2 - tvec * (len_a / length)
+        h2 = p2 + tvec * (len_b / length)
+
+        # 自動クランプ：極値（前後のキーが同じ側）ではハンドルを水平にし、
+        # それ以外でもハンドルが前後のキーの値を超えないようにする
+        ydiff1 = p1[1] - p2[1]
+        ydiff2 = p3[1] - p2[1]
+        if (ydiff1 <= 0.0 and ydiff2 <= 0.0) or (ydiff1 >= 0.0 and ydiff2 >= 0.0):
+            h1[1] = h2[1] = p2[1]
+        else:
+            left_violate = (p1[1] > h1[1]) if ydiff1 <= 0.0 else (p1[1] < h1[1])
+            right_violate = (p3[1] > h2[1]) if ydiff2 <= 0.0 else (p3[1] < h2[1])
+            if left_violate:
+                h1[1] = p1[1]
+                h2[1] = p2[1] + (p2[1] - h1[1]) / (h1[0] - p2[0]) * (p2[0] - h2[0])
+            elif right_violate:
+                h2[1] = p3[1]
+                h1[1] = p2[1] + (p2[1] - h2[1]) / (p2[0] - h2[0]) * (h1[0] - p2[0])
+
+        # 最初と最後のキー（外挿は一定）はハンドルを水平にする
+        if i == 0 or i == count - 1:
+            h1[1] = h2[1] = p2[1]
+        left[i] = h1
+        right[i] = h2
+    return left, right
+
+
+def _cubic(p0, p1, p2, p3, t):
+    s = 1.0 - t
+    return s * s * s * p0 + 3.0 * s * s * t * p1 + 3.0 * s * t * t * p2 + t * t * t * p3
+
+
+def evaluate_channel(keys, frames):
+    # 1本のFカーブを frames（配列）で評価する。キーの範囲外は一定の値で外挿する
+    frames = np.asarray(frames, dtype=np.float64)
+    points = np.asarray(keys, dtype=np.float64).reshape(-1, 2)
+    if len(points) == 1:
+        return np.full(frames.shape, points[0, 1])
+    left, right = auto_clamped_handles(points)
+
+    segment = np.clip(np.searchsorted(points[:, 0], frames, side="right") - 1, 0, len(points) - 2)
+    x0, y0 = points[segment, 0], points[segment, 1]
+    x1, y1 = points[segment + 1, 0], points[segment + 1, 1]
+    hx0, hy0 = right[segment, 0], right[segment, 1]
+    hx1, hy1 = left[segment + 1, 0], left[segment + 1, 1]
+
+    # X(t) = frame となる t を二分法で求める（自動ハンドルでは X(t) は単調増加）
+    target = np.clip(frames, x0, x1)
+    lo = np.zeros_like(target)
+    hi = np.ones_like(target)
+    for _ in range(48):
+        mid = (lo + hi) / 2
+        below = _cubic(x0, hx0, hx1, x1, mid) < target
+        lo = np.where(below, mid, lo)
+        hi = np.where(below, hi, mid)
+    values = _cubic(y0, hy0, hy1, y1, (lo + hi) / 2)
+
+    values = np.where(frames <= points[0, 0], points[0, 1], values)
+    return np.where(frames >= points[-1, 0], points[-1, 1], values)
+
+
+def evaluate_keyframes(frames, bone_names, keyframes=KEYFRAMES):
+    # 各フレームの各ボーンの rotation_euler を (F, len(bone_names), 3) の配列[ラジアン]で返す
+    # apply_timeline() と同じく、保持のキーを取り除いたFカーブを評価する
+    frames = np.atleast_1d(np.asarray(frames, dtype=np.float64))
+    eulers = np.zeros((len(frames), len(bone_names), 3))
+    columns = {name: column for column, name in enumerate(bone_names)}
+    for (bone, axis), keys in keyframe_channels(keyframes).items():
+        if bone in columns:
+            eulers[:, columns[bone], axis] = evaluate_channel(drop_hold_keys(keys), frames)
+    return eulers
@@ -0,0 +1,255 @@
+import math
+
+import numpy as np
+
+
+from wrap_params import WrapParams
+from wrap_rig import fold_regions, fold_spec
+
+# 頂点グループ（ボーン）の並び順（wrap_rig.fold_spec の順）。ウェイト配列の列はこの順番になる
+BONE_NAMES = tuple(spec.bone.name for spec in fold_spec(WrapParams()))
+
+
+def paper_matrix_world(params):
+    # 包装紙オブジェクトのワールド行列（Z軸回転＋オフセット移動）
+    c = math.cos(params.paper_rotation)
+    s = math.sin(params.paper_rotation)
+    return np.array([
+        [c, -s, 0.0, params.paper_offset_x],
+        [s, c, 0.0, params.paper_offset_y],
+        [0.0, 0.0, 1.0, 0.0],
+        [0.0, 0.0, 0.0, 1.0],
+    ])
+
+
+def to_world(co, matrix_world):
+    # (N, 3) のローカル座標を1回の行列積でワールド座標に変換する
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    matrix_world = np.asarray(matrix_world, dtype=np.float64)
+    return co @ matrix_world[:3, :3].T + matrix_world[:3, 3]
+
+
+# ウェイトの減衰の式（fold_spec の falloff の種類）
+# distance は領域の辺（折り目）からの距離、lateral は辺に沿った座標（領域の頂点の分だけの配列）
+
+def _ramp(distance, lateral, length):
+    # 折り目で 0.0 → length の距離で 1.0
+    return np.minimum(1.0, distance / length)
+
+
+def _ramp_fade(distance, lateral, length, fade_start, fade_length):
+    # _ramp と同じだが、fade_start より先は fade_length の距離で 1.0 → 0.0 に下げる
+    return np.where(
+        distance > fade_start,
+        np.maximum(0.0, 1.0 - (distance - fade_start) / fade_length),
+        np.minimum(1.0, distance / length),
+    )
+
+
+def _step(distance, lateral, start):
+    # start より先だけ 1.0
+    return np.where(distance > start, 1.0, 0.0)
+
+
+def _outer_ramp(distance, lateral, length, reach):
+    # 折り目から reach の中間地点までは 0.0、それより外側は端に向かって _ramp まで上げる
+    if reach > 0.01:
+        ratio = distance / reach
+    else:
+        ratio = np.zeros_like(distance)
+    return np.where(ratio < 0.5, 0.0, (ratio - 0.5) * 2.0 * np.minimum(1.0, distance / length))
+
+
+def _band(distance, lateral, length, center, tolerance):
+    # 辺に沿った center ± tolerance の帯の中だけ。帯の中心ほど、折り目に近いほど強い
+    is_in_band = (center - tolerance <= lateral) & (lateral <= center + tolerance)
+    lateral_influence = np.clip(1.0 - np.abs(lateral - center) / tolerance, 0.0, 1.0)
+    distance_influence = np.where(distance > 0, np.maximum(0.0, 1.0 - distance / length), 1.0)
+    return np.where(is_in_band, lateral_influence * distance_influence, 0.0)
+
+
+FALLOFFS = {
+    "ramp": _ramp,
+    "ramp_fade": _ramp_fade,
+    "step": _step,
+    "outer_ramp": _outer_ramp,
+    "band": _band,
+}
+
+
+# 減衰の式の勾配が変わる位置（折り目からの距離のリスト, 辺に沿った座標のリスト）
+# 引数は FALLOFFS の同じ種類の式と同じ（paper_mesh.crease_lines が adaptive のメッシュを細かくする位置に使う）
+
+def _ramp_creases(length):
+    return [0.0, length], []
+
+
+def _ramp_fade_creases(length, fade_start, fade_length):
+    return [0.0, length, fade_start, fade_start + fade_length], []
+
+
+def _step_creases(start):
+    return [start], []
+
+
+def _outer_ramp_creases(length, reach):
+    # 中間地点（ratio = 0.5）と、それより外側で _ramp が 1.0 になる所
+    middle = reach / 2
+    return [middle] + ([length] if length > middle else []), []
+
+
+def _band_creases(length, center, tolerance):
+    return [length], [center - tolerance, center, center + tolerance]
+
+
+FALLOFF_CREASES = {
+    "ramp": _ramp_creases,
+    "ramp_fade": _ramp_fade_creases,
+    "step": _step_creases,
+    "outer_ramp": _outer_ramp_creases,
+    "band": _band_creases,
+}
+
+
+def region_cells(regions):
+    # マス (X側, Y側) → 領域の番号（-1 は底面）の表
+    cell_regions = np.full(9, -1, dtype=np.int8)
+    for index, region in enumerate(regions):
+        for other_side in (0, *region.corners):
+            sides = [0, 0]
+            sides[region.axis] = region.side
+            sides[1 - region.axis] = other_side
+            cell = (sides[0] + 1) * 3 + (sides[1] + 1)
+            if cell_regions[cell] != -1:
+                raise ValueError(f"領域 {region.name} と {regions[cell_regions[cell]].name} が重なっています")
+            cell_regions[cell] = index
+    return cell_regions
+
+
+def region_labels(world_co, params, cell_regions):
+    # 各頂点の領域の番号（-1 は底面）。X・Y それぞれ箱の辺の内側(0)・外側(-1/+1)のどこにあるかでマスを決める
+    world_co = np.asarray(world_co, dtype=np.float64).reshape(-1, 3)
+    x = world_co[:, 0]
+    y = world_co[:, 1]
+    x_side = (x > params.half_width).astype(np.int8) - (x < -params.half_width).astype(np.int8)
+    y_side = (y > params.half_depth).astype(np.int8) - (y < -params.half_depth).astype(np.int8)
+    return cell_regions[(x_side + 1) * 3 + (y_side + 1)]
+
+
+def compile_fold_spec(params, regions, spec):
+    # 領域とボーンの定義から、全頂点のウェイトを計算する関数を作る
+    # 頂点ごとに X・Y それぞれ箱の辺の内側(0)・外側(-1/+1)のどこにあるかで 3x3 のマスが決まり、
+    # マスから領域を表引きする。各頂点はその領域のボーンの式だけを計算するので、
+    # 側面（フラップ）の数が増えても頂点あたりの計算量は増えない
+    cell_regions = region_cells(regions)
+
+    # 領域ごとのボーン（ウェイト配列の列, 減衰の式, 引数）
+    region_index = {region.name: index for index, region in enumerate(regions)}
+    region_bones = [[] for _ in regions]
+    for column, bone_spec in enumerate(spec):
+        kind, *args = bone_spec.falloff
+        region_bones[region_index[bone_spec.region]].append((column, FALLOFFS[kind], args))
+
+    def evaluate(world_co):
+        world_co = np.asarray(world_co, dtype=np.float64).reshape(-1, 3)
+        weights = np.zeros((len(world_co), len(spec)))
+
+        # 頂点を領域ごとに並べ替える（底面の頂点は先頭に集まる）
+        labels = region_labels(world_co, params, cell_regions)
+        order = np.argsort(labels, kind="stable")
+        ends = np.cumsum(np.bincount(labels + 1, minlength=len(regions) + 1))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for index, region in enumerate(regions):
+                indices = order[ends[index]:ends[index + 1]]
+                if len(indices) == 0 or not region_bones[index]:
+                    continue
+                region_co = world_co[indices]
+                distance = np.abs(region_co[:, region.axis] - region.edge)
+                lateral = region_co[:, 1 - region.axis]
+                for column, falloff, args in region_bones[index]:
+                    weights[indices, column] = falloff(distance, lateral, *args)
+
+        # VertexGroup.add() はウェイトを 0.0〜1.0 に丸めて格納するので、同じ値にそろえる
+        return np.clip(weights, 0.0, 1.0)
+
+    return evaluate
+
+
+def compute_fold_weights(world_co, params):
+    # 包装紙の全頂点のウェイトをまとめて計算する
+    # 戻り値は (N, len(BONE_NAMES)) の配列（定義は wrap_rig.fold_spec）
+    return compile_fold_spec(params, fold_regions(params), fold_spec(params))(world_co)
+
+
+def fold_patches(world_co, params):
+    # 包装紙の各頂点が、ウェイトがなめらかに変わる範囲（パッチ）のどこにあるか
+    # 戻り値は (領域の番号（fold_regions の番号、-1 は底面）, 辺から数えて何番目の帯か) の配列の組
+    # 領域の分け方は compute_fold_weights() と同じで、領域の中も "step" の減衰の境目で辺からの距離ごとに帯に分ける
+    # 違うパッチの頂点のウェイトは互いに関係しない（底面と接する帯0だけは例外で、どのボーンも折り目で 0.0 から始まる）
+    regions = fold_regions(params)
+    world_co = np.asarray(world_co, dtype=np.float64).reshape(-1, 3)
+    labels = region_labels(world_co, params, region_cells(regions))
+    bands = np.zeros(len(world_co), dtype=np.int64)
+    region_steps = {region.name: set() for region in regions}
+    for bone_spec in fold_spec(params):
+        if bone_spec.falloff[0] == "step":
+            region_steps[bone_spec.region].add(bone_spec.falloff[1])
+    for index, region in enumerate(regions):
+        starts = region_steps[region.name]
+        is_in_region = labels == index
+        distance = np.abs(world_co[is_in_region, region.axis] - region.edge)
+        # _step と同じ比較（start より先が次の帯）
+        bands[is_in_region] = sum((distance > start).astype(np.int64) for start in starts)
+    return labels, bands
+
+
+def group_by_weight(bone_weights):
+    # 1本のボーンのウェイト列を「同じウェイトの頂点インデックス」ごとにまとめる
+    # ウェイト0の頂点は含めない（頂点グループに登録しない）
+    # 頂点グループは float32 で保持されるので、float32 に丸めた値でまとめる
+    bone_weights = np.asarray(bone_weights, dtype=np.float32)
+    indices = np.flatnonzero(bone_weights > 0.0)
+    if len(indices) == 0:
+        return []
+    values, inverse = np.unique(bone_weights[indices], return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    splits = np.cumsum(np.bincount(inverse, minlength=len(values)))[:-1]
+    return [
+        (float(weight), group_indices.tolist())
+        for weight, group_indices in zip(values, np.split(indices[order], splits))
+    ]
+
+
+def assign_vertex_groups(vertex_groups, weights):
+    # 同じウェイトの頂点ごとに VertexGroup.add() を1回だけ呼ぶ
+    # 戻り値は add() の呼び出し回数
+    calls = 0
+    for vertex_group, bone_weights in zip(vertex_groups, np.asarray(weights).T):
+        for weight, indices in group_by_weight(bone_weights):
+            vertex_group.add(indices, weight, 'REPLACE')
+            calls += 1
+    return calls
+
+
+def membership_count(weights):
+    # 頂点グループへの登録数（ウェイト0を登録しない場合）
+    return int(np.count_nonzero(np.asarray(weights, dtype=np.float32) > 0.0))
+
+
+def to_sparse(weights):
+    # ボーンごとの（ウェイトが0でない頂点のインデックス, ウェイト）のリスト（BONE_NAMES の順）
+    weights = np.asarray(weights, dtype=np.float32)
+    sparse = []
+    for bone_weights in weights.T:
+        indices = np.flatnonzero(bone_weights > 0.0)
+        sparse.append((indices, bone_weights[indices]))
+    return sparse
+
+
+def from_sparse(sparse, vertex_count):
+    # to_sparse() の逆変換。(N, len(sparse)) の配列に戻す
+    weights = np.zeros((vertex_count, len(sparse)), dtype=np.float32)
+    for column, (indices, bone_weights) in enumerate(sparse):
+        weights[indices, column] = bone_weights
+    return weights